@@ -0,0 +1,138 @@
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from config import AGENT_POOL_SIZE, AGENT_POOL_MAX_SIZE
+from agent_registry import get_agent_registry
+
+
+class AgentPool:
+    """Pool of pre-built LangChain GlobalMarketEntryAgent instances.
+
+    All agents share one LLM client and one search tool; each request gets an
+    agent to itself for the duration of acquire(), so nothing per-request is
+    shared between concurrent sessions. When every agent is busy the pool
+    builds more, up to max_size, then waits for one to be released.
+    """
+
+    def __init__(self, size=AGENT_POOL_SIZE, max_size=AGENT_POOL_MAX_SIZE, factory=None):
+        self.size = size
+        self.max_size = max(size, max_size)
+        self._factory = factory
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._llm = None
+        self._search_tool = None
+        self._warm_thread = None
+        self._uses = {}
+
+        self.built = 0
+        self.construction_seconds = 0.0
+        self.last_construction_seconds = 0.0
+        self.acquisitions = 0
+        self.reuses = 0
+        self.in_use = 0
+        self.wait_seconds = 0.0
+
+    def _build(self):
+        """Construct one agent around the shared clients"""
+        started = time.perf_counter()
+        if self._factory is not None:
+            agent = self._factory()
+        else:
+            GlobalMarketEntryAgent = get_agent_registry().load("LangChain Market Entry")
+            with self._lock:
+                if self._llm is None:
+                    self._llm = GlobalMarketEntryAgent.create_llm()
+                    self._search_tool = GlobalMarketEntryAgent.create_search_tool()
+            agent = GlobalMarketEntryAgent(llm=self._llm, search_tool=self._search_tool)
+        elapsed = time.perf_counter() - started
+
+        with self._lock:
+            self.construction_seconds += elapsed
+            self.last_construction_seconds = elapsed
+            self._uses[id(agent)] = 0
+        return agent
+
+    def _reserve_build(self, limit):
+        """Claim a slot for a new agent if fewer than `limit` have been built"""
+        with self._lock:
+            if self.built >= limit:
+                return False
+            self.built += 1
+            return True
+
+    def _build_reserved(self):
+        try:
+            return self._build()
+        except Exception:
+            with self._lock:
+                self.built -= 1
+            raise
+
+    def warm(self, background=False):
+        """Pre-build agents up to the pool size, optionally on a background thread"""
+        def fill():
+            while self._reserve_build(self.size):
+                self._idle.put(self._build_reserved())
+
+        if background:
+            self._warm_thread = threading.Thread(target=fill, name="agent-pool-warmup", daemon=True)
+            self._warm_thread.start()
+        else:
+            fill()
+
+    @contextmanager
+    def acquire(self, timeout=None):
+        """Borrow an agent for one request"""
+        started = time.perf_counter()
+        try:
+            agent = self._idle.get_nowait()
+        except queue.Empty:
+            if self._reserve_build(self.max_size):
+                agent = self._build_reserved()
+            else:
+                agent = self._idle.get(timeout=timeout)
+
+        with self._lock:
+            self.wait_seconds += time.perf_counter() - started
+            self.acquisitions += 1
+            if self._uses[id(agent)]:
+                self.reuses += 1
+            self._uses[id(agent)] += 1
+            self.in_use += 1
+
+        try:
+            yield agent
+        finally:
+            with self._lock:
+                self.in_use -= 1
+            self._idle.put(agent)
+
+    def metrics(self):
+        with self._lock:
+            return {
+                "built": self.built,
+                "idle": self._idle.qsize(),
+                "in_use": self.in_use,
+                "acquisitions": self.acquisitions,
+                "reuses": self.reuses,
+                "construction_seconds_total": round(self.construction_seconds, 3),
+                "construction_seconds_avg": round(self.construction_seconds / self.built, 3) if self.built else 0.0,
+                "construction_seconds_last": round(self.last_construction_seconds, 3),
+                "acquire_wait_seconds_total": round(self.wait_seconds, 3)
+            }
+
+
+_agent_pool = None
+_agent_pool_lock = threading.Lock()
+
+
+def get_agent_pool():
+    """Process-wide AgentPool; the first call starts warming it in the background"""
+    global _agent_pool
+    with _agent_pool_lock:
+        if _agent_pool is None:
+            _agent_pool = AgentPool()
+            _agent_pool.warm(background=True)
+        return _agent_pool
@@ -0,0 +1,73 @@
+import importlib
+import threading
+import time
+
+# Agent name -> (module, class). Modules are only imported when the agent is
+# first used, so a page pays for the agent and SDK imports it needs and no more.
+AGENT_MODULES = {
+    "Market Research": ("market_research_agent", "MarketResearchAgent"),
+    "Competitive Intelligence": ("competitive_intelligence_agent", "CompetitiveIntelligenceAgent"),
+    "Cultural Intelligence": ("cultural_intelligence_agent", "CulturalIntelligenceAgent"),
+    "Financial Analysis": ("financial_analysis_agent", "FinancialAnalysisAgent"),
+    "Regulatory Compliance": ("regulatory_compliance_agent", "RegulatoryComplianceAgent"),
+    "Strategy Recommendation": ("strategy_recommendation_agent", "StrategyRecommendationAgent"),
+    "LangChain Market Entry": ("langchain_agent", "GlobalMarketEntryAgent"),
+    "Gemini Market Entry": ("ai_agent", "GlobalMarketEntryAgent"),
+}
+
+# The BaseAgent agents offered by the multi-agent app
+MULTI_AGENT_NAMES = [
+    "Market Research", "Competitive Intelligence", "Cultural Intelligence",
+    "Financial Analysis", "Regulatory Compliance", "Strategy Recommendation"
+]
+
+
+class AgentRegistry:
+    """Agent classes by name, each imported on first use.
+
+    The time taken by each first import, including the SDKs the module pulls
+    in that weren't loaded yet, is kept in import_seconds.
+    """
+
+    def __init__(self, modules=None):
+        self.modules = dict(modules or AGENT_MODULES)
+        self.import_seconds = {}
+        self._classes = {}
+        self._lock = threading.Lock()
+
+    def names(self):
+        return list(self.modules)
+
+    def load(self, name):
+        """The agent's class, importing its module if needed"""
+        with self._lock:
+            if name in self._classes:
+                return self._classes[name]
+            if name not in self.modules:
+                raise KeyError(f"Unknown agent: {name!r}")
+            module_name, class_name = self.modules[name]
+            started = time.perf_counter()
+            agent_class = getattr(importlib.import_module(module_name), class_name)
+            self.import_seconds[name] = time.perf_counter() - started
+            self._classes[name] = agent_class
+            return agent_class
+
+    def create(self, name, *args, **kwargs):
+        return self.load(name)(*args, **kwargs)
+
+    def import_times(self):
+        with self._lock:
+            return {name: round(seconds, 3) for name, seconds in self.import_seconds.items()}
+
+
+_agent_registry = None
+_agent_registry_lock = threading.Lock()
+
+
+def get_agent_registry():
+    """Process-wide AgentRegistry"""
+    global _agent_registry
+    with _agent_registry_lock:
+        if _agent_registry is None:
+            _agent_registry = AgentRegistry()
+        return _agent_registry
@@ -1,30 +1,71 @@
 import google.generativeai as genai
 from tavily import TavilyClient
 import json
+import re
 import pandas as pd
 from datetime import datetime, timedelta
 from config import *
+from cache import CachedSearchClient, get_llm_cache
+from hs_classifier import get_hs_index
+from market_scoring import market_data_features, rank_markets
+from tariff_store import get_tariff_store
+from query_planner import QUERY_TEMPLATES, plan_market_searches
+from prompt_compaction import compact
+from task_runner import run_parallel
+from instrumentation import InstrumentedGeminiModel, InstrumentedTavilyClient, track_analysis
+from report_engine import ONE_PAGE_REPORT_SECTIONS, ReportEngine
+from translation import ListingTranslator, listing_languages
+
+DEFAULT_COUNTRIES = ["Germany", "UAE", "Canada"]
+MARKET_FIELDS = ["tariff_rate", "market_size", "competitors"]
 
 class GlobalMarketEntryAgent:
-    def __init__(self):
+    def __init__(self, bypass_llm_cache=False, score_weights=None):
         # Initialize Gemini
         genai.configure(api_key=GEMINI_API_KEY)
-        self.model = genai.GenerativeModel(GEMINI_MODEL)
+        self.model = InstrumentedGeminiModel(genai.GenerativeModel(GEMINI_MODEL))
+        self.bypass_llm_cache = bypass_llm_cache
+        self.score_weights = score_weights
+        # Per-call timings, tokens and cache status of the most recent analysis
+        self.last_analysis_metrics = None
         
         # Initialize Tavily
-        self.tavily_client = TavilyClient(api_key=TAVILY_API_KEY)
-        
-    def analyze_product(self, product_name, product_description=""):
+        self.tavily_client = CachedSearchClient(InstrumentedTavilyClient(TavilyClient(api_key=TAVILY_API_KEY)))
+        
+        # One-page report, written section by section
+        self.report_engine = ReportEngine(
+            ONE_PAGE_REPORT_SECTIONS,
+            self._generate,
+            self._stream_generate,
+            length="two to four concise sentences or bullet points"
+        )
+        
+    def _generate(self, prompt, bypass_cache=None):
+        """Generate a response with Gemini, reusing cached answers for identical prompts"""
+        if bypass_cache is None:
+            bypass_cache = self.bypass_llm_cache
+        
+        return get_llm_cache().fetch(
+            GEMINI_MODEL,
+            None,  # Model default temperature
+            prompt,
+            lambda: self.model.generate_content(prompt).text.strip(),
+            bypass=bypass_cache
+        )
+    
+    def analyze_product(self, product_name, product_description="", target_countries=None):
         """Analyze product and determine HS code and market potential"""
         
-        # Determine HS Code
-        hs_code = self._get_hs_code(product_name, product_description)
-        
-        # Get market analysis
-        market_data = self._analyze_global_markets(hs_code, product_name)
-        
-        # Generate recommendations
-        recommendations = self._generate_recommendations(market_data, product_name)
+        with track_analysis(product_name) as analysis:
+            # Determine HS Code
+            hs_code = self._get_hs_code(product_name, product_description)
+            
+            # Get market analysis
+            market_data = self._analyze_global_markets(hs_code, product_name, target_countries)
+            
+            # Generate recommendations
+            recommendations = self._generate_recommendations(market_data, product_name)
+        self.last_analysis_metrics = analysis
         
         return {
             "product_name": product_name,
@@ -34,8 +75,37 @@ class GlobalMarketEntryAgent:
             "timestamp": datetime.now().isoformat()
         }
     
+    def analyze_products(self, products, target_countries=None):
+        """Analyze several products together, sharing searches that don't depend on the product.
+        
+        products: list of product names or (name, description) pairs.
+        """
+        products = [(product, "") if isinstance(product, str) else tuple(product) for product in products]
+        with track_analysis(", ".join(name for name, _ in products)) as analysis:
+            hs_codes = {name: self._get_hs_code(name, description) for name, description in products}
+            
+            market_data = self._analyze_markets(hs_codes, target_countries)
+            
+            results = [
+                {
+                    "product_name": name,
+                    "hs_code": hs_codes[name],
+                    "market_analysis": market_data[name],
+                    "recommendations": self._generate_recommendations(market_data[name], name),
+                    "timestamp": datetime.now().isoformat()
+                }
+                for name, _ in products
+            ]
+        self.last_analysis_metrics = analysis
+        return results
+    
     def _get_hs_code(self, product_name, description):
         """Determine HS code for the product"""
+        # Resolve locally first; only ask the model when the index isn't confident
+        hs_code, confidence = get_hs_index().classify(product_name, description)
+        if hs_code and confidence >= HS_CLASSIFIER_MIN_CONFIDENCE:
+            return hs_code
+        
         prompt = f"""
         Analyze this product and determine the most appropriate HS code:
         Product: {product_name}
@@ -47,8 +117,7 @@ class GlobalMarketEntryAgent:
         If not found in mappings, analyze the product and suggest the most appropriate HS code.
         """
         
-        response = self.model.generate_content(prompt)
-        hs_code = response.text.strip()
+        hs_code = self._generate(prompt)
         
         # Fallback to mapping if AI doesn't return valid format
         if len(hs_code) != 6 or not hs_code.isdigit():
@@ -59,108 +128,284 @@ class GlobalMarketEntryAgent:
         
         return hs_code
     
-    def _analyze_global_markets(self, hs_code, product_name):
+    def _analyze_global_markets(self, hs_code, product_name, target_countries=None):
         """Analyze global markets using Tavily search"""
+        return self._analyze_markets({product_name: hs_code}, target_countries)[product_name]
+    
+    def _analyze_markets(self, hs_codes, target_countries=None):
+        """Market data per product and country; hs_codes maps product name -> HS code"""
+        
+        countries = target_countries or DEFAULT_COUNTRIES
+        max_workers = MAX_CONCURRENCY if CONCURRENT_ANALYSIS else 1
         
-        search_queries = [
-            f"tariff rates {hs_code} Germany UAE Canada 2024",
-            f"market size {product_name} sustainable eco-friendly Germany",
-            f"competitor analysis {product_name} Germany Amazon.de",
-            f"ESG sustainability regulations Germany {product_name}",
-            f"export requirements Germany {product_name} certification",
-            f"distributor networks Germany sustainable products",
-            f"government incentives export Germany sustainable products"
-        ]
+        if BATCHED_EXTRACTION:
+            fetched = self._fetch_market_fields_batched(hs_codes, countries, max_workers)
+        else:
+            fetched = {}
+            for product_name, hs_code in hs_codes.items():
+                per_product = self._fetch_market_fields(hs_code, product_name, countries, max_workers)
+                fetched.update({(product_name, country, field): value for (country, field), value in per_product.items()})
         
         market_data = {}
         
-        for country in ["Germany", "UAE", "Canada"]:
-            market_data[country] = {
-                "tariff_rate": self._get_tariff_rate(hs_code, country),
-                "market_size": self._get_market_size(product_name, country),
-                "competitors": self._get_competitors(product_name, country),
-                "entry_channels": self._get_entry_channels(country),
-                "regulations": self._get_regulations(product_name, country),
-                "incentives": GOVERNMENT_INCENTIVES.get(country, {})
-            }
+        for product_name in hs_codes:
+            market_data[product_name] = {}
+            for country in countries:
+                market_data[product_name][country] = {
+                    field: fetched.get((product_name, country, field), self._default_market_field(field, country))
+                    for field in MARKET_FIELDS
+                }
+                market_data[product_name][country].update({
+                    "entry_channels": self._get_entry_channels(country),
+                    "regulations": self._get_regulations(product_name, country),
+                    "incentives": GOVERNMENT_INCENTIVES.get(country, {})
+                })
         
         return market_data
     
+    def _fetch_market_fields(self, hs_code, product_name, countries, max_workers):
+        """Fetch each (country, field) with its own search and LLM call"""
+        field_getters = {
+            "tariff_rate": lambda country: self._get_tariff_rate(hs_code, country),
+            "market_size": lambda country: self._get_market_size(product_name, country),
+            "competitors": lambda country: self._get_competitors(product_name, country),
+        }
+        
+        tasks = {
+            (country, field): (lambda getter=getter, country=country: getter(country))
+            for country in countries
+            for field, getter in field_getters.items()
+        }
+        fetched, errors = run_parallel(tasks, max_workers=max_workers)
+        for (country, field), e in errors.items():
+            print(f"Error getting {field} for {country}: {e}")
+        
+        return fetched
+    
+    def _fetch_market_fields_batched(self, hs_codes, countries, max_workers):
+        """Run all searches as one planned batch, then extract each (product, country) with one LLM call"""
+        # Tariffs found in the local table need neither a search nor extraction
+        fetched = {}
+        for product_name, hs_code in hs_codes.items():
+            for country in countries:
+                rate = get_tariff_store().lookup(hs_code, country)
+                if rate is not None:
+                    fetched[(product_name, country, "tariff_rate")] = rate
+        
+        plan = plan_market_searches(hs_codes, countries, MARKET_FIELDS, hs_codes=hs_codes, skip=set(fetched))
+        search_results, errors = plan.execute(self._run_search, max_workers=max_workers)
+        for (product_name, country, field), e in errors.items():
+            print(f"Error searching {field} for {product_name} in {country}: {e}")
+            # With no search results the model would only guess, so use the default
+            fetched[(product_name, country, field)] = self._default_market_field(field, country)
+        
+        extract_tasks = {}
+        for product_name, hs_code in hs_codes.items():
+            for country in countries:
+                fields = [field for field in MARKET_FIELDS if (product_name, country, field) not in fetched]
+                if fields:
+                    extract_tasks[(product_name, country)] = (
+                        lambda product_name=product_name, hs_code=hs_code, country=country, fields=fields:
+                        self._extract_market_fields(
+                            hs_code,
+                            product_name,
+                            country,
+                            {field: search_results.get((product_name, country, field), []) for field in fields}
+                        )
+                    )
+        extracted, errors = run_parallel(extract_tasks, max_workers=max_workers)
+        for (product_name, country), e in errors.items():
+            print(f"Error extracting market data for {product_name} in {country}: {e}")
+        
+        fetched.update({
+            (product_name, country, field): value
+            for (product_name, country), fields in extracted.items()
+            for field, value in fields.items()
+        })
+        return fetched
+    
+    def _default_market_field(self, field, country):
+        """Fallback value for a market field whose lookup failed"""
+        defaults = {
+            "tariff_rate": 5.0,  # Default tariff rate
+            "market_size": f"Growing market for sustainable products in {country}",
+            "competitors": f"Competitive market with established sustainable brands in {country}"
+        }
+        
+        return defaults[field]
+    
+    def _search_market_field(self, field, hs_code, product_name, country):
+        """Run the Tavily search backing one market field"""
+        template, max_results = QUERY_TEMPLATES[field]
+        search_query = template.format(product=product_name, country=country, hs_code=hs_code)
+        return self._run_search(search_query, max_results)
+    
+    def _run_search(self, search_query, max_results):
+        """Run a Tavily search and return its result list"""
+        response = self.tavily_client.search(
+            query=search_query,
+            search_depth=TAVILY_SEARCH_DEPTH,
+            max_results=max_results
+        )
+        return response['results']
+    
+    def _extract_market_fields(self, hs_code, product_name, country, search_results):
+        """Extract the fields in search_results for a country from one JSON response.
+        
+        Only fields that fail validation are re-prompted; anything still invalid
+        after EXTRACTION_MAX_REPROMPTS falls back to its default value.
+        """
+        instructions = {
+            "tariff_rate": f'number, the approximate import tariff percentage for HS code {hs_code} (0 for duty-free)',
+            "market_size": f'string, a brief summary of market size and growth potential for {product_name}',
+            "competitors": f'string, 3-5 main competitors for {product_name} with estimated price ranges'
+        }
+        labels = {
+            "tariff_rate": "Tariff search results",
+            "market_size": "Market size search results",
+            "competitors": "Competitor search results"
+        }
+        
+        values = {}
+        pending = [field for field in MARKET_FIELDS if field in search_results]
+        
+        for attempt in range(1 + EXTRACTION_MAX_REPROMPTS):
+            # Split the prompt's token budget across the fields still being asked for
+            budget = PROMPT_TOKEN_BUDGET // len(pending)
+            sections = "\n".join(
+                f"{labels[field]}:\n{compact(search_results[field], instructions[field], budget)}"
+                for field in pending
+            )
+            schema = "\n".join(f'- "{field}": {instructions[field]}' for field in pending)
+            prompt = f"""
+            Based on this search data about {product_name} in {country}, extract the requested fields.
+            
+            {sections}
+            
+            Return only a JSON object with exactly these keys:
+            {schema}
+            """
+            
+            try:
+                # A re-prompt must not be answered from the cache
+                data = self._parse_json_object(self._generate(prompt, bypass_cache=True if attempt else None))
+            except Exception as e:
+                print(f"Error extracting market data for {country}: {e}")
+                continue
+            
+            for field in list(pending):
+                value = self._validate_market_field(field, data.get(field))
+                if value is not None:
+                    values[field] = value
+                    pending.remove(field)
+            
+            if not pending:
+                break
+        
+        for field in pending:
+            values[field] = self._default_market_field(field, country)
+        
+        return values
+    
+    def _parse_json_object(self, text):
+        """Parse the first JSON object in a model response, ignoring code fences"""
+        match = re.search(r"\{.*\}", text, re.DOTALL)
+        if not match:
+            raise ValueError("No JSON object in model response")
+        data = json.loads(match.group(0))
+        if not isinstance(data, dict):
+            raise ValueError("Model response is not a JSON object")
+        return data
+    
+    def _validate_market_field(self, field, value):
+        """Return the normalized field value, or None if it fails validation"""
+        if field == "tariff_rate":
+            return self._parse_tariff_rate(value)
+        
+        if isinstance(value, list):
+            value = "\n".join(f"- {item}" for item in value if str(item).strip())
+        if isinstance(value, str) and value.strip():
+            return value.strip()
+        return None
+    
+    def _parse_tariff_rate(self, value):
+        """Parse a tariff percentage such as 5.2, "5.2%" or "duty-free"; None if invalid"""
+        if isinstance(value, bool) or value is None:
+            return None
+        if isinstance(value, (int, float)):
+            rate = float(value)
+        else:
+            text = str(value).lower()
+            if "free" in text:
+                return 0.0
+            match = re.search(r"\d+(?:\.\d+)?", text)
+            if not match:
+                return None
+            rate = float(match.group(0))
+        
+        return rate if 0 <= rate <= 100 else None
+    
     def _get_tariff_rate(self, hs_code, country):
         """Get tariff rate for product in specific country"""
-        search_query = f"tariff rate HS code {hs_code} {country} 2024 import duty"
+        rate = get_tariff_store().lookup(hs_code, country)
+        if rate is not None:
+            return rate
         
         try:
-            response = self.tavily_client.search(
-                query=search_query,
-                search_depth=TAVILY_SEARCH_DEPTH,
-                max_results=5
-            )
+            results = self._search_market_field("tariff_rate", hs_code, None, country)
             
             # Analyze search results with Gemini
             prompt = f"""
             Based on this search data, what is the approximate tariff rate for HS code {hs_code} in {country}?
-            Search results: {response['results']}
+            Search results: {compact(results, f"tariff rate import duty HS code {hs_code} {country}")}
             
             Return only a number (percentage) like "5.2" or "0" for duty-free.
             """
             
-            result = self.model.generate_content(prompt)
-            return float(result.text.strip().replace("%", "")) if result.text.strip().replace("%", "").replace(".", "").isdigit() else 5.0
+            rate = self._parse_tariff_rate(self._generate(prompt))
+            return rate if rate is not None else self._default_market_field("tariff_rate", country)
             
         except Exception as e:
             print(f"Error getting tariff rate: {e}")
-            return 5.0  # Default tariff rate
+            return self._default_market_field("tariff_rate", country)
     
     def _get_market_size(self, product_name, country):
         """Get market size information"""
-        search_query = f"market size {product_name} sustainable eco-friendly {country} 2024"
-        
         try:
-            response = self.tavily_client.search(
-                query=search_query,
-                search_depth=TAVILY_SEARCH_DEPTH,
-                max_results=3
-            )
+            results = self._search_market_field("market_size", None, product_name, country)
             
             prompt = f"""
             Based on this search data, provide market size information for {product_name} in {country}:
-            {response['results']}
+            {compact(results, f"market size growth {product_name} {country}")}
             
             Return a brief summary of market size and growth potential.
             """
             
-            result = self.model.generate_content(prompt)
-            return result.text.strip()
+            result = self._generate(prompt)
+            return result
             
         except Exception as e:
             print(f"Error getting market size: {e}")
-            return f"Growing market for sustainable products in {country}"
+            return self._default_market_field("market_size", country)
     
     def _get_competitors(self, product_name, country):
         """Get competitor information"""
-        search_query = f"competitors {product_name} sustainable {country} Amazon marketplace"
-        
         try:
-            response = self.tavily_client.search(
-                query=search_query,
-                search_depth=TAVILY_SEARCH_DEPTH,
-                max_results=5
-            )
+            results = self._search_market_field("competitors", None, product_name, country)
             
             prompt = f"""
             Based on this search data, identify main competitors for {product_name} in {country}:
-            {response['results']}
+            {compact(results, f"competitors brands prices {product_name} {country}")}
             
             Return a list of 3-5 main competitors with estimated price ranges.
             """
             
-            result = self.model.generate_content(prompt)
-            return result.text.strip()
+            result = self._generate(prompt)
+            return result
             
         except Exception as e:
             print(f"Error getting competitors: {e}")
-            return f"Competitive market with established sustainable brands in {country}"
+            return self._default_market_field("competitors", country)
     
     def _get_entry_channels(self, country):
         """Get market entry channels"""
@@ -233,69 +478,57 @@ class GlobalMarketEntryAgent:
         Format as a structured recommendation report.
         """
         
-        result = self.model.generate_content(prompt)
-        return result.text.strip()
+        result = self._generate(prompt)
+        return result
     
     def _find_best_market(self, market_data):
         """Find the best market based on analysis"""
-        scores = {}
-        
-        for country, data in market_data.items():
-            score = 0
-            # Lower tariff is better
-            tariff = data.get("tariff_rate", 5.0)
-            score += (10 - min(tariff, 10)) * 2
-            
-            # Germany gets bonus for sustainability focus
-            if country == "Germany":
-                score += 5
-            
-            # Canada gets bonus for ease of entry
-            if country == "Canada":
-                score += 3
-            
-            scores[country] = score
-        
-        return max(scores, key=scores.get)
+        rankings = rank_markets(market_data_features(market_data), self.score_weights)
+        return rankings.iloc[0]["country"]
     
     def generate_report(self, analysis_result):
-        """Generate comprehensive market entry report"""
-        
-        prompt = f"""
-        Create a professional 1-page market entry report based on this analysis:
-        
-        {json.dumps(analysis_result, indent=2)}
-        
-        Include:
-        1. Executive Summary
-        2. Market Opportunity Analysis
-        3. Competitive Landscape
-        4. Entry Strategy
-        5. Risk Assessment
-        6. Government Incentives
-        7. Next Steps
+        """Generate the market entry report, writing its sections in parallel"""
+        return self.report_engine.generate(analysis_result)
+    
+    def stream_report(self, analysis_result, bypass_cache=None):
+        """Generate the market entry report, yielding (section name, text chunk) pairs as they arrive"""
+        yield from self.report_engine.stream(analysis_result, bypass_cache)
+    
+    def regenerate_report_section(self, analysis_result, sections, section_name):
+        """Rewrite one section of a report from report_engine.generate_sections(); returns the updated sections"""
+        return self.report_engine.regenerate_section(analysis_result, sections, section_name)
+    
+    def _stream_generate(self, prompt, bypass_cache=None):
+        """Stream a Gemini response through the LLM cache, yielding text chunks"""
+        if bypass_cache is None:
+            bypass_cache = self.bypass_llm_cache
+        
+        yield from get_llm_cache().stream(
+            GEMINI_MODEL,
+            None,  # Model default temperature
+            prompt,
+            lambda: (chunk.text for chunk in self.model.generate_content(prompt, stream=True)),
+            bypass=bypass_cache
+        )
+    
+    def translate_product_listings(self, product_name, description, languages=None, target_countries=None):
+        """Translate a product listing into several languages with as few model calls as possible.
         
-        Format as a professional business report.
+        Languages default to those of target_countries (English markets are
+        skipped). Returns {language: {"name", "description"}}; translations are
+        cached per listing and language.
         """
-        
-        result = self.model.generate_content(prompt)
-        return result.text.strip()
+        if languages is None:
+            languages = listing_languages(target_countries or DEFAULT_COUNTRIES)
+        return ListingTranslator(self._generate).translate(product_name, description, languages)
     
     def translate_product_listing(self, product_name, description, target_language="German"):
         """Translate product listing for target market"""
         
-        prompt = f"""
-        Translate this product listing to {target_language}:
-        
-        Product Name: {product_name}
-        Description: {description}
-        
-        Make it culturally appropriate for {target_language} speakers and optimize for e-commerce platforms.
-        Include relevant keywords for sustainability and eco-friendly products.
-        """
-        
-        result = self.model.generate_content(prompt)
-        return result.text.strip()
+        translation = self.translate_product_listings(product_name, description, [target_language]).get(target_language)
+        if translation is None:
+            return f"Translation into {target_language} is not available."
+        return f"{translation['name']}\n\n{translation['description']}"
     
     def generate_partner_list(self, target_country, product_category):
         """Generate potential partner list"""
@@ -311,7 +544,7 @@ class GlobalMarketEntryAgent:
             
             prompt = f"""
             Based on this search data, create a list of potential partners for {product_category} in {target_country}:
-            {response['results']}
+            {compact(response['results'], f"distributors importers partners {product_category} {target_country}")}
             
             Format as a structured list with:
             - Company name
@@ -320,8 +553,8 @@ class GlobalMarketEntryAgent:
             - Partnership potential
             """
             
-            result = self.model.generate_content(prompt)
-            return result.text.strip()
+            result = self._generate(prompt)
+            return result
             
         except Exception as e:
             print(f"Error generating partner list: {e}")
@@ -1,6 +1,6 @@
 import streamlit as st
-from langchain_agent import GlobalMarketEntryAgent
-import pandas as pd
+from agent_pool import get_agent_pool
+from streamlit_utils import analysis_key, memoized_analysis, render_report
 from datetime import datetime
 
 # --- App Config ---
@@ -11,6 +11,9 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Agents are pre-built once per process and reused across sessions
+agent_pool = get_agent_pool()
+
 # --- Sidebar ---
 st.sidebar.image(
     "https://images.unsplash.com/photo-1506744038136-46273834b3fb?auto=format&fit=crop&w=400&q=80",
@@ -46,36 +49,74 @@ with st.form("product_form"):
             ["Germany", "UAE", "Canada", "India", "UK", "Australia", "Netherlands", "Sweden", "Norway", "Denmark"],
             default=["Germany", "UAE", "Canada"]
         )
+        include_report = st.checkbox("Write a full market entry report after the analysis")
+        recheck = st.checkbox("Re-check a previous analysis (refresh only sections that are stale or changed)")
     submitted = st.form_submit_button("🚀 Explore Global Opportunities")
 
 # --- Run Analysis ---
+# The latest result stays in session state, so reruns from downloads and
+# widget clicks show it again instead of re-running the analysis. Analyses
+# run as a pipeline so their sections are stored for later re-checks, which
+# then refresh the same sections in the same format.
 if submitted and product_name:
-    with st.spinner("Analyzing global opportunities. This may take up to 1-2 minutes..."):
-        agent = GlobalMarketEntryAgent()
-        result = agent.analyze_product(product_name, product_description, target_countries)
-        analysis = result["analysis"]
-        timestamp = result["timestamp"]
+    key = analysis_key("LangChain Market Entry (pipeline)", product_name, product_description, target_countries)
+    state = st.session_state.get("analysis")
+    if recheck or state is None or state["key"] != key:
+        with st.spinner("Analyzing global opportunities. This may take up to 1-2 minutes..."):
+            if recheck:
+                # A re-check is always run, refreshing whatever is stale
+                with agent_pool.acquire() as agent:
+                    result = agent.reanalyze_product(product_name, product_description, target_countries)
+            else:
+                def analyze():
+                    with agent_pool.acquire() as agent:
+                        return agent.analyze_product(product_name, product_description, target_countries, mode="pipeline")
+                result = memoized_analysis(key, analyze)
+        state = {"key": key, "result": result, "recheck": recheck, "report": None}
+        st.session_state["analysis"] = state
+
+    state["write_report"] = include_report and state["report"] is None
+
+elif submitted and not product_name:
+    st.error("Please enter a product name to proceed.")
+
+state = st.session_state.get("analysis")
+if state is not None:
+    result = state["result"]
+    analysis = result["analysis"]
+    timestamp = result["timestamp"]
 
     st.success(f"Analysis complete! (Generated: {datetime.fromisoformat(timestamp).strftime('%Y-%m-%d %H:%M')})")
+    if result.get("truncated"):
+        st.warning(f"The analysis was cut short ({result['truncation_reason']}); some sections may be missing.")
+    if state["recheck"]:
+        sections = result["sections"]
+        st.info(f"Refreshed {len(sections['refreshed'])} sections; reused {len(sections['reused'])} unchanged ones.")
 
     # --- Results Display ---
     st.header("📈 Market Insights & Recommendations")
     st.markdown(analysis)
 
+    # --- Full Report, rendered as it is generated; shown from session state afterwards ---
+    if state.pop("write_report", False):
+        st.header("📄 Market Entry Report")
+        with agent_pool.acquire() as agent:
+            state["report"] = render_report(agent.stream_comprehensive_report(result), agent.report_engine)
+    elif state["report"] is not None:
+        st.header("📄 Market Entry Report")
+        st.markdown(state["report"])
+
     # --- Downloadable Report ---
     st.download_button(
         label="📄 Download Market Entry Report (PDF)",
-        data=analysis,
-        file_name=f"market_entry_report_{product_name.replace(' ', '_')}.txt",
+        data=state["report"] or analysis,
+        file_name=f"market_entry_report_{result['product_name'].replace(' ', '_')}.txt",
         mime="text/plain"
     )
 
     # --- Bonus: Schedule Follow-up ---
     st.info("A follow-up will be scheduled in 30 days to recheck trends. You will be notified if tariffs or competitors change.")
 
-elif submitted and not product_name:
-    st.error("Please enter a product name to proceed.")
-
 # --- Footer ---
 st.markdown("""
 ---
@@ -1,5 +1,13 @@
+import asyncio
 import os
+import threading
 import streamlit as st
+from config import MAX_CONCURRENCY, AGENT_COUNTRY_TIMEOUT_SECONDS, AGENT_PASSAGES_PER_COUNTRY
+from search_client import get_search_client, warm_up_search_client
+
+# API keys resolved so far, shared by every agent in the process
+_resolved_api_keys = {}
+_resolved_api_keys_lock = threading.Lock()
 
 class BaseAgent:
     def __init__(self, required_api_keys=None):
@@ -10,13 +18,21 @@ class BaseAgent:
         if required_api_keys is None:
             required_api_keys = []
         self.required_api_keys = required_api_keys
+        # Set to use another search client than the process-wide one
+        self.search_client = None
         self._check_and_prompt_api_keys()
 
     def _check_and_prompt_api_keys(self):
-        """Check for required API keys in env, prompt user if missing, and set for session."""
+        """Check for required API keys in env, prompt user if missing, and set for session.
+        Keys found once are remembered for the process; only missing keys are prompted for again."""
         for key_info in self.required_api_keys:
             key_name = key_info["name"]
             key_label = key_info.get("label", key_name)
+            with _resolved_api_keys_lock:
+                api_key = _resolved_api_keys.get(key_name)
+            if api_key:
+                self.api_keys[key_name] = api_key
+                continue
             api_key = os.getenv(key_name)
             # Special case: prefill Tavily key if user provided
             if key_name == "TAVILY_API_KEY" and not api_key:
@@ -31,10 +47,53 @@ class BaseAgent:
                 api_key = st.sidebar.text_input(f"Enter {key_label}", type="password", key=key_name)
                 if api_key:
                     os.environ[key_name] = api_key
+            if api_key:
+                with _resolved_api_keys_lock:
+                    _resolved_api_keys[key_name] = api_key
             self.api_keys[key_name] = api_key
 
     def get_api_key(self, key_name):
         return self.api_keys.get(key_name) or os.getenv(key_name)
 
-    def analyze(self, *args, **kwargs):
-        raise NotImplementedError("Each agent must implement its own analyze method.") 
\ No newline at end of file
+    def get_search_client(self):
+        """Process-wide pooled Tavily client whose searches go through the shared search cache"""
+        if self.search_client is not None:
+            return self.search_client
+        return get_search_client(self.get_api_key("TAVILY_API_KEY"))
+
+    def warm_up(self):
+        """Open the search client's connection ahead of the first analysis"""
+        warm_up_search_client(self.get_api_key("TAVILY_API_KEY"))
+
+    def country_query(self, product_name, product_description, country):
+        """Search query the default aanalyze() runs for one country"""
+        raise NotImplementedError("Each agent must implement country_query or its own aanalyze method.")
+
+    async def aanalyze(self, product_name, product_description, target_countries):
+        """Analyze the product for each country and return markdown, one paragraph per country in the given order.
+
+        The default runs country_query() for every country concurrently, at most
+        MAX_CONCURRENCY at a time, gives each country AGENT_COUNTRY_TIMEOUT_SECONDS
+        and reports its top AGENT_PASSAGES_PER_COUNTRY results.
+        """
+        tavily = self.get_search_client()
+        semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+
+        async def research(country):
+            query = self.country_query(product_name, product_description, country)
+            async with semaphore:
+                try:
+                    search = await asyncio.wait_for(tavily.asearch(query=query, max_results=AGENT_PASSAGES_PER_COUNTRY), AGENT_COUNTRY_TIMEOUT_SECONDS)
+                except asyncio.TimeoutError:
+                    print(f"{type(self).__name__}: search for {country} timed out")
+                    return f"Not available (search timed out after {AGENT_COUNTRY_TIMEOUT_SECONDS:g}s)."
+                except Exception as e:
+                    print(f"{type(self).__name__}: search for {country} failed: {e}")
+                    return f"Not available ({e})."
+            return " ".join(result['content'] for result in search['results']) if search['results'] else 'No data found.'
+
+        summaries = await asyncio.gather(*(research(country) for country in target_countries))
+        return "\n\n".join(f"**{country}**: {summary}" for country, summary in zip(target_countries, summaries))
+
+    def analyze(self, product_name, product_description, target_countries):
+        return asyncio.run(self.aanalyze(product_name, product_description, target_countries)) 
\ No newline at end of file
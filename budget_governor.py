@@ -0,0 +1,84 @@
+import threading
+import time
+from langchain_core.callbacks import BaseCallbackHandler
+from config import ANALYSIS_MAX_SECONDS, ANALYSIS_MAX_TOKENS, ANALYSIS_MAX_TOOL_CALLS
+from instrumentation import current_analysis
+
+
+class BudgetExceeded(RuntimeError):
+    """Raised from a callback to stop a run that has used up one of its budgets"""
+
+
+class BudgetGovernor(BaseCallbackHandler):
+    """Callback handler enforcing a wall-clock deadline, a token budget and a
+    tool call budget on one analysis.
+
+    Budgets are checked before every LLM call, agent action and tool run the
+    handler sees; the first one found exhausted raises BudgetExceeded, which
+    aborts the run. Tool outputs seen so far are kept in `observations` so the
+    caller can still return a partial answer. Token spend is read from the
+    current analysis' metrics, which also cover LLM calls made inside tools.
+    Pass None for a budget to disable it.
+    """
+
+    raise_error = True
+    run_inline = True
+
+    def __init__(self, max_seconds=ANALYSIS_MAX_SECONDS, max_tokens=ANALYSIS_MAX_TOKENS,
+                 max_tool_calls=ANALYSIS_MAX_TOOL_CALLS, analysis=None):
+        self.max_seconds = max_seconds
+        self.max_tokens = max_tokens
+        self.max_tool_calls = max_tool_calls
+        self.analysis = analysis or current_analysis()
+        self.started = time.monotonic()
+        self.tool_calls = 0
+        self.observations = []
+        self.exceeded = None
+        self._lock = threading.Lock()
+
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    def tokens_used(self):
+        if self.analysis is None:
+            return 0
+        return sum(stats["prompt_tokens"] + stats["completion_tokens"] for stats in self.analysis.breakdown().values())
+
+    def check(self):
+        """Raise BudgetExceeded if any budget is used up"""
+        if self.exceeded is None:
+            if self.max_seconds is not None and self.elapsed() > self.max_seconds:
+                self.exceeded = f"time budget of {self.max_seconds:g}s exceeded"
+            elif self.max_tokens is not None and self.tokens_used() > self.max_tokens:
+                self.exceeded = f"token budget of {self.max_tokens} exceeded"
+        if self.exceeded is not None:
+            raise BudgetExceeded(self.exceeded)
+
+    def on_llm_start(self, serialized, prompts, **kwargs):
+        self.check()
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        self.check()
+
+    def on_agent_action(self, action, **kwargs):
+        self.check()
+
+    def on_tool_start(self, serialized, input_str, **kwargs):
+        self.check()
+        with self._lock:
+            if self.max_tool_calls is not None and self.tool_calls >= self.max_tool_calls:
+                self.exceeded = self.exceeded or f"tool call budget of {self.max_tool_calls} exceeded"
+                raise BudgetExceeded(self.exceeded)
+            self.tool_calls += 1
+
+    def on_tool_end(self, output, *, name=None, **kwargs):
+        with self._lock:
+            self.observations.append((name or "tool", output))
+
+    def stats(self):
+        return {
+            "elapsed_seconds": round(self.elapsed(), 3),
+            "tokens": self.tokens_used(),
+            "tool_calls": self.tool_calls,
+            "exceeded": self.exceeded
+        }
@@ -0,0 +1,382 @@
+import asyncio
+import contextvars
+import functools
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from config import (
+    SEARCH_CACHE_PATH, SEARCH_CACHE_MAX_ENTRIES, SEARCH_CACHE_TTLS,
+    LLM_CACHE_PATH, LLM_CACHE_MAX_ENTRIES, LLM_CACHE_MEMORY_ENTRIES, LLM_CACHE_TTL
+)
+from outbound import call_provider, acall_provider, stream_provider
+from instrumentation import call_context, record_call, result_size
+
+
+def normalize_query(query):
+    """Lowercase and collapse whitespace so trivially different queries share a key"""
+    return re.sub(r"\s+", " ", str(query)).strip().lower()
+
+
+class DiskCache:
+    """SQLite-backed key/value store with per-entry TTL and LRU size eviction"""
+
+    def __init__(self, path, max_entries):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                expires REAL NOT NULL,
+                accessed REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+        self._conn.commit()
+
+    def get(self, key):
+        """Return the cached value, or None if missing or expired"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or row[1] < now:
+                if row is not None:
+                    self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                    self._conn.commit()
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key, value, ttl):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, expires, accessed) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now + ttl, now)
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """Drop the least recently used entries beyond max_entries"""
+        count = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY accessed LIMIT ?)",
+                (overflow,)
+            )
+            self.evictions += overflow
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+            self._conn.commit()
+
+    def stats(self):
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": size,
+            "max_entries": self.max_entries
+        }
+
+
+class SearchCache(DiskCache):
+    """Search result cache keyed on normalized query, search depth and result count"""
+
+    # Checked in order; the first category whose keywords appear in the query wins
+    CATEGORY_KEYWORDS = [
+        ("tariff", ["tariff", "import duty", "customs", "hs code"]),
+        ("competitor", ["competitor", "market share", "price range"]),
+        ("regulation", ["regulation", "compliance", "certification"]),
+        ("incentive", ["incentive", "subsid", "grant"]),
+        ("distributor", ["distributor", "importer", "partner"]),
+        ("market", ["market size", "growth", "trend"]),
+    ]
+
+    def __init__(self, path=SEARCH_CACHE_PATH, max_entries=SEARCH_CACHE_MAX_ENTRIES, ttls=None):
+        super().__init__(path, max_entries)
+        self.ttls = dict(SEARCH_CACHE_TTLS, **(ttls or {}))
+        self.category_hits = {}
+        self.category_misses = {}
+
+    def categorize(self, query):
+        normalized = normalize_query(query)
+        for category, keywords in self.CATEGORY_KEYWORDS:
+            if any(keyword in normalized for keyword in keywords):
+                return category
+        return "default"
+
+    def make_key(self, query, search_depth, max_results, **options):
+        payload = json.dumps(
+            [normalize_query(query), search_depth, max_results, options],
+            sort_keys=True,
+            default=str
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def fetch(self, query, search_fn, search_depth=None, max_results=None, provider="tavily", bypass=False, **options):
+        """Return cached results for the query, calling search_fn() on a miss.
+
+        Misses go through the provider's outbound policy, so concurrent misses
+        for the same key share one search. With bypass=True the search always
+        runs and its results replace the cached ones.
+        """
+        started = time.perf_counter()
+        key = self.make_key(query, search_depth, max_results, **options)
+        category = self.categorize(query)
+
+        cached = None if bypass else self.get(key)
+        if cached is not None:
+            self.category_hits[category] = self.category_hits.get(category, 0) + 1
+            record_call(provider, "search", time.perf_counter() - started, size=result_size(cached), cache="hit")
+            return cached
+
+        self.category_misses[category] = self.category_misses.get(category, 0) + 1
+        with call_context(cache="bypass" if bypass else "miss"):
+            results = call_provider(provider, search_fn, key=key)
+        self.set(key, results, self.ttls.get(category, self.ttls["default"]))
+        return results
+
+    async def afetch(self, query, asearch_fn, search_depth=None, max_results=None, provider="tavily", **options):
+        """fetch() for coroutines: awaits asearch_fn() on a miss"""
+        started = time.perf_counter()
+        key = self.make_key(query, search_depth, max_results, **options)
+        category = self.categorize(query)
+
+        cached = self.get(key)
+        if cached is not None:
+            self.category_hits[category] = self.category_hits.get(category, 0) + 1
+            record_call(provider, "search", time.perf_counter() - started, size=result_size(cached), cache="hit")
+            return cached
+
+        self.category_misses[category] = self.category_misses.get(category, 0) + 1
+        with call_context(cache="miss"):
+            results = await acall_provider(provider, asearch_fn, key=key)
+        self.set(key, results, self.ttls.get(category, self.ttls["default"]))
+        return results
+
+    def stats(self):
+        stats = super().stats()
+        stats["category_hits"] = dict(self.category_hits)
+        stats["category_misses"] = dict(self.category_misses)
+        return stats
+
+
+# Worker threads for CachedSearchClient.asearch()
+_search_threads = ThreadPoolExecutor(thread_name_prefix="search")
+
+
+class CachedSearchClient:
+    """Drop-in wrapper for TavilyClient whose search() goes through a SearchCache"""
+
+    def __init__(self, client, cache=None):
+        self.client = client
+        self.cache = cache or get_search_cache()
+
+    def search(self, query, search_depth="basic", max_results=5, **kwargs):
+        return self.cache.fetch(
+            query,
+            lambda: self.client.search(query=query, search_depth=search_depth, max_results=max_results, **kwargs),
+            search_depth=search_depth,
+            max_results=max_results,
+            **kwargs
+        )
+
+    async def asearch(self, query, search_depth="basic", max_results=5, **kwargs):
+        """search() for coroutines; a miss runs the client's blocking search on a worker thread.
+
+        The threads are not the event loop's default executor, so a caller that
+        times out on a slow search isn't kept waiting for it when its loop closes.
+        """
+        loop = asyncio.get_running_loop()
+        search = functools.partial(self.client.search, query=query, search_depth=search_depth, max_results=max_results, **kwargs)
+        return await self.cache.afetch(
+            query,
+            lambda: loop.run_in_executor(_search_threads, contextvars.copy_context().run, search),
+            search_depth=search_depth,
+            max_results=max_results,
+            **kwargs
+        )
+
+
+class LLMResponseCache:
+    """Two-tier LLM response cache: a bounded in-memory LRU in front of a DiskCache.
+
+    Entries are content-addressed by a hash of model name, temperature and prompt.
+    """
+
+    def __init__(self, path=LLM_CACHE_PATH, max_entries=LLM_CACHE_MAX_ENTRIES,
+                 memory_entries=LLM_CACHE_MEMORY_ENTRIES, ttl=LLM_CACHE_TTL):
+        self.disk = DiskCache(path, max_entries)
+        self.memory_entries = memory_entries
+        self.ttl = ttl
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.bypasses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+    def make_key(self, model, temperature, prompt):
+        payload = json.dumps([model, temperature, prompt], default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._memory[key] = value
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def get(self, model, temperature, prompt):
+        key = self.make_key(model, temperature, prompt)
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return self._memory[key]
+
+        value = self.disk.get(key)
+        if value is not None:
+            self.disk_hits += 1
+            self._remember(key, value)
+        return value
+
+    def set(self, model, temperature, prompt, value):
+        key = self.make_key(model, temperature, prompt)
+        self._remember(key, value)
+        self.disk.set(key, value, self.ttl)
+
+    def fetch(self, model, temperature, prompt, generate_fn, bypass=False, provider="gemini"):
+        """Return the cached response, calling generate_fn() on a miss.
+
+        With bypass=True the cache is not read, but the fresh answer replaces
+        whatever was stored for the prompt.
+        """
+        started = time.perf_counter()
+        if bypass:
+            self.bypasses += 1
+        else:
+            cached = self.get(model, temperature, prompt)
+            if cached is not None:
+                record_call(provider, "llm", time.perf_counter() - started, size=result_size(cached), cache="hit")
+                return cached
+            self.misses += 1
+
+        with call_context(cache="bypass" if bypass else "miss"):
+            value = call_provider(provider, generate_fn, key=self.make_key(model, temperature, prompt))
+        self.set(model, temperature, prompt, value)
+        return value
+
+    async def afetch(self, model, temperature, prompt, agenerate_fn, bypass=False, provider="gemini"):
+        """fetch() for coroutines: awaits agenerate_fn() on a miss"""
+        started = time.perf_counter()
+        if bypass:
+            self.bypasses += 1
+        else:
+            cached = self.get(model, temperature, prompt)
+            if cached is not None:
+                record_call(provider, "llm", time.perf_counter() - started, size=result_size(cached), cache="hit")
+                return cached
+            self.misses += 1
+
+        with call_context(cache="bypass" if bypass else "miss"):
+            value = await acall_provider(provider, agenerate_fn, key=self.make_key(model, temperature, prompt))
+        self.set(model, temperature, prompt, value)
+        return value
+
+    def stream(self, model, temperature, prompt, stream_fn, bypass=False, provider="gemini"):
+        """Yield response text chunks, replaying a cached response as a single chunk.
+
+        stream_fn() returns an iterable of text chunks. The full response is
+        cached once the stream completes.
+        """
+        started = time.perf_counter()
+        if bypass:
+            self.bypasses += 1
+        else:
+            cached = self.get(model, temperature, prompt)
+            if cached is not None:
+                record_call(provider, "llm", time.perf_counter() - started, size=result_size(cached), cache="hit")
+                yield cached
+                return
+            self.misses += 1
+
+        def open_stream():
+            # Annotated here rather than around the loop, which spans the caller's yields
+            with call_context(cache="bypass" if bypass else "miss"):
+                return stream_fn()
+
+        chunks = []
+        for chunk in stream_provider(provider, open_stream):
+            chunks.append(chunk)
+            yield chunk
+        self.set(model, temperature, prompt, "".join(chunks).strip())
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        self.disk.clear()
+
+    def stats(self):
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "bypasses": self.bypasses,
+            "memory_size": len(self._memory),
+            "disk": self.disk.stats()
+        }
+
+
+_search_cache = None
+_search_cache_lock = threading.Lock()
+
+
+def get_search_cache():
+    """Process-wide SearchCache shared by every agent"""
+    global _search_cache
+    with _search_cache_lock:
+        if _search_cache is None:
+            _search_cache = SearchCache()
+        return _search_cache
+
+
+_llm_cache = None
+_llm_cache_lock = threading.Lock()
+
+
+def get_llm_cache():
+    """Process-wide LLMResponseCache shared by both GlobalMarketEntryAgent variants"""
+    global _llm_cache
+    with _llm_cache_lock:
+        if _llm_cache is None:
+            _llm_cache = LLMResponseCache()
+        return _llm_cache
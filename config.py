@@ -7,9 +7,133 @@ load_dotenv()
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
 TAVILY_API_KEY = os.getenv('TAVILY_API_KEY')
 
+# Local Data Files
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
 # Model Configuration
 GEMINI_MODEL = "gemini-pro"
 TAVILY_SEARCH_DEPTH = "advanced"
+TAVILY_SEARCH_URL = "https://api.tavily.com/search"
+# Keep-alive connections held by the shared search client
+SEARCH_POOL_MAXSIZE = int(os.getenv('SEARCH_POOL_MAXSIZE', 10))
+SEARCH_TIMEOUT_SECONDS = 100
+
+# Concurrency Settings
+CONCURRENT_ANALYSIS = True
+MAX_CONCURRENCY = int(os.getenv('MAX_CONCURRENCY', 6))
+TASK_TIMEOUT_SECONDS = float(os.getenv('TASK_TIMEOUT_SECONDS', 45))
+# Deadline for the LangChain analyze_market tool; fields not done by then are returned as unavailable
+MARKET_TOOL_DEADLINE_SECONDS = float(os.getenv('MARKET_TOOL_DEADLINE_SECONDS', 60))
+# Pipeline market tasks may re-check their sources before calling analyze_market,
+# so their task timeout leaves this much room beyond the tool's deadline
+MARKET_TASK_TIMEOUT_MARGIN_SECONDS = 30
+# Time limit for each country's search in the BaseAgent agents
+AGENT_COUNTRY_TIMEOUT_SECONDS = float(os.getenv('AGENT_COUNTRY_TIMEOUT_SECONDS', 30))
+# Search results each BaseAgent agent reports per country
+AGENT_PASSAGES_PER_COUNTRY = 2
+# Cross-agent search aggregation: queries merged into one search, and results fetched per merged query
+SEARCH_MERGE_MAX_QUERIES = 3
+SEARCH_MERGE_RESULTS_PER_QUERY = 3
+SEARCH_MERGE_MAX_RESULTS = 10
+# "Run all agents" mode of the multi-agent app: agents run at once and time limit per agent
+MULTI_AGENT_MAX_CONCURRENCY = int(os.getenv('MULTI_AGENT_MAX_CONCURRENCY', 6))
+MULTI_AGENT_TIMEOUT_SECONDS = float(os.getenv('MULTI_AGENT_TIMEOUT_SECONDS', 120))
+
+# Structured Extraction Settings
+BATCHED_EXTRACTION = True
+EXTRACTION_MAX_REPROMPTS = 1
+
+# Streamlit apps: finished analyses are reused for identical requests for this long
+ANALYSIS_CACHE_TTL_SECONDS = int(os.getenv('ANALYSIS_CACHE_TTL_SECONDS', 6 * 60 * 60))
+ANALYSIS_CACHE_MAX_ENTRIES = 200
+
+# LangChain Agent Mode: "agent" lets the model pick tools step by step,
+# "pipeline" runs the same tools as a fixed parallel dependency graph
+LANGCHAIN_ANALYSIS_MODE = os.getenv('LANGCHAIN_ANALYSIS_MODE', 'agent')
+
+# Analysis Budgets (LangChain agent): a run that uses up any of these stops
+# early and returns what it has so far, flagged as truncated
+ANALYSIS_MAX_SECONDS = float(os.getenv('ANALYSIS_MAX_SECONDS', 180))
+ANALYSIS_MAX_TOKENS = int(os.getenv('ANALYSIS_MAX_TOKENS', 60000))
+ANALYSIS_MAX_TOOL_CALLS = int(os.getenv('ANALYSIS_MAX_TOOL_CALLS', 25))
+AGENT_MAX_ITERATIONS = int(os.getenv('AGENT_MAX_ITERATIONS', 15))
+
+# Warm Agent Pool (LangChain agent)
+AGENT_POOL_SIZE = int(os.getenv('AGENT_POOL_SIZE', 2))
+AGENT_POOL_MAX_SIZE = int(os.getenv('AGENT_POOL_MAX_SIZE', 8))
+
+# Prompt Compaction: approximate token budget for search results in one prompt
+PROMPT_TOKEN_BUDGET = int(os.getenv('PROMPT_TOKEN_BUDGET', 1200))
+
+# Instrumentation: recent calls kept per name for percentiles, and optional
+# export files (JSON lines appended per analysis, Prometheus textfile rewritten)
+METRICS_WINDOW = int(os.getenv('METRICS_WINDOW', 1000))
+METRICS_LOG_PATH = os.getenv('METRICS_LOG_PATH')
+METRICS_PROMETHEUS_PATH = os.getenv('METRICS_PROMETHEUS_PATH')
+
+# Report Generation: token budgets for the analysis slice behind each report
+# section and for each section's share of the executive summary prompt
+REPORT_SECTION_TOKEN_BUDGET = int(os.getenv('REPORT_SECTION_TOKEN_BUDGET', 600))
+REPORT_SUMMARY_TOKENS_PER_SECTION = 150
+
+# Outbound API Policy: (requests per second, burst) per provider.
+# The Gemini bucket follows the key's per-minute quota; the default is the
+# paid tier's 360 requests per minute for gemini-pro. Set
+# GEMINI_REQUESTS_PER_MINUTE to your own quota (15 on the free tier), or
+# GEMINI_RATE_LIMIT to a requests-per-second rate. The burst, capped at a
+# minute's quota, lets the parallel extraction, section and translation
+# calls start together.
+GEMINI_REQUESTS_PER_MINUTE = float(os.getenv('GEMINI_REQUESTS_PER_MINUTE', 360))
+OUTBOUND_RATE_LIMITS = {
+    "tavily": (float(os.getenv('TAVILY_RATE_LIMIT', 5)), 10),
+    "gemini": (float(os.getenv('GEMINI_RATE_LIMIT', GEMINI_REQUESTS_PER_MINUTE / 60)), min(20, max(1, int(GEMINI_REQUESTS_PER_MINUTE)))),
+    "default": (2.0, 5)
+}
+OUTBOUND_MAX_RETRIES = 4
+OUTBOUND_BACKOFF_BASE = 1.0
+OUTBOUND_BACKOFF_MAX = 30.0
+
+# Search Cache Settings
+SEARCH_CACHE_PATH = os.getenv('SEARCH_CACHE_PATH', '.cache/search_cache.sqlite3')
+SEARCH_CACHE_MAX_ENTRIES = 5000
+DAY_SECONDS = 24 * 60 * 60
+SEARCH_CACHE_TTLS = {
+    "tariff": 30 * DAY_SECONDS,
+    "regulation": 14 * DAY_SECONDS,
+    "incentive": 14 * DAY_SECONDS,
+    "distributor": 7 * DAY_SECONDS,
+    "market": 7 * DAY_SECONDS,
+    "competitor": 2 * DAY_SECONDS,
+    "default": 3 * DAY_SECONDS
+}
+
+# LLM Response Cache Settings
+LLM_CACHE_PATH = os.getenv('LLM_CACHE_PATH', '.cache/llm_cache.sqlite3')
+LLM_CACHE_MAX_ENTRIES = 20000
+LLM_CACHE_MEMORY_ENTRIES = 256
+LLM_CACHE_TTL = 30 * DAY_SECONDS
+
+# Section Store: sections of earlier analyses, reused by incremental re-analysis
+# until their TTL expires or their source search results change
+SECTION_STORE_PATH = os.getenv('SECTION_STORE_PATH', '.cache/section_store.sqlite3')
+SECTION_STORE_MAX_ENTRIES = 20000
+SECTION_TTLS = {
+    "hs_code": 180 * DAY_SECONDS,
+    "tariff": 30 * DAY_SECONDS,
+    "market": 7 * DAY_SECONDS,
+    "competitors": 2 * DAY_SECONDS,
+    "incentives": 14 * DAY_SECONDS,
+    "recommendations": 30 * DAY_SECONDS,
+    "default": 7 * DAY_SECONDS
+}
+
+# Listing Translation Cache: one entry per (listing, language), so a new target
+# market only costs the languages not translated before
+TRANSLATION_CACHE_PATH = os.getenv('TRANSLATION_CACHE_PATH', '.cache/translation_cache.sqlite3')
+TRANSLATION_CACHE_MAX_ENTRIES = 5000
+TRANSLATION_CACHE_TTL = 90 * DAY_SECONDS
+TRANSLATION_BATCH_SIZE = 5  # languages per model call
+TRANSLATION_MAX_REPROMPTS = 1
 
 # Market Analysis Settings
 SUPPORTED_COUNTRIES = [
@@ -17,6 +141,29 @@ SUPPORTED_COUNTRIES = [
     "Netherlands", "Sweden", "Norway", "Denmark"
 ]
 
+# Listing language per market (English markets need no translation)
+LANGUAGE_BY_COUNTRY = {
+    "Germany": "German",
+    "UAE": "Arabic",
+    "Canada": "French",
+    "India": "Hindi",
+    "UK": "English",
+    "Australia": "English",
+    "Netherlands": "Dutch",
+    "Sweden": "Swedish",
+    "Norway": "Norwegian",
+    "Denmark": "Danish"
+}
+
+# Market Scoring Weights (relative; normalized before use)
+MARKET_SCORE_WEIGHTS = {
+    "tariff_rate": 0.35,
+    "market_size": 0.25,
+    "competitor_density": 0.15,
+    "incentive_count": 0.15,
+    "regulatory_burden": 0.10
+}
+
 # HS Code Mapping for Common Products
 HS_CODE_MAPPING = {
     "bamboo toothbrush": "960321",
@@ -31,6 +178,14 @@ HS_CODE_MAPPING = {
     "biodegradable products": "391100"
 }
 
+# Local HS Code Classifier
+HS_CODE_TABLE_PATH = os.path.join(DATA_DIR, "hs_codes.json")
+HS_CLASSIFIER_MIN_CONFIDENCE = 0.8
+
+# Local Tariff Table
+TARIFF_STORE_PATH = os.getenv('TARIFF_STORE_PATH', os.path.join(DATA_DIR, "tariffs.npy"))
+TARIFF_SOURCE_CSV = os.getenv('TARIFF_SOURCE_CSV')
+
 # Government Incentive Programs
 GOVERNMENT_INCENTIVES = {
     "India": {
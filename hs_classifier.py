@@ -0,0 +1,226 @@
+import difflib
+import json
+import math
+import re
+import threading
+from config import HS_CODE_MAPPING, HS_CODE_TABLE_PATH
+
+STOPWORDS = {"a", "an", "the", "and", "or", "for", "with", "of", "in", "on", "to", "from", "by", "made"}
+
+# Weight of a token that only appears in the description, relative to the product name
+DESCRIPTION_WEIGHT = 0.6
+# Minimum similarity for a misspelled token to count as a fuzzy match
+FUZZY_MIN_SIMILARITY = 0.85
+# Weight of an unexplained product name word that precedes the matched words
+MODIFIER_WEIGHT = 0.25
+
+
+def _stem(token):
+    """Very small plural stripper, applied identically to the table and to queries"""
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if token.endswith(("ches", "shes", "sses", "xes")):
+        return token[:-2]
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def _trigrams(token):
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class HSCodeIndex:
+    """Local HS code classifier: an inverted index over keyword phrases.
+
+    Every keyword phrase in the HS code table is tokenized, stemmed and mapped
+    through the synonym groups, then indexed token -> phrases. Queries also try
+    joined adjacent tokens ("tooth brush" -> "toothbrush") and fall back to
+    character-trigram fuzzy matching for tokens that aren't in the vocabulary.
+    """
+
+    def __init__(self, entries=(), synonyms=()):
+        self.canonical = {}
+        for group in synonyms:
+            for word in group:
+                self.canonical[_stem(word.lower())] = _stem(group[0].lower())
+
+        self.phrases = []  # (code, tokens)
+        self.descriptions = {}
+        self.inverted = {}
+        self.trigram_index = {}
+        self._idf = None
+
+        for entry in entries:
+            self.descriptions.setdefault(entry["code"], entry.get("description", ""))
+            for keyword in entry.get("keywords", []):
+                self.add(entry["code"], keyword)
+
+    @classmethod
+    def from_file(cls, path=HS_CODE_TABLE_PATH):
+        """Load the HS code table from JSON and merge in config.HS_CODE_MAPPING"""
+        with open(path, encoding="utf-8") as f:
+            table = json.load(f)
+
+        index = cls(table.get("codes", []), table.get("synonyms", []))
+        for keyword, code in HS_CODE_MAPPING.items():
+            index.add(code, keyword)
+        return index
+
+    def _tokens(self, text):
+        raw = [t for t in re.split(r"[^a-z0-9]+", str(text).lower()) if t]
+        tokens = [self.canonical.get(_stem(t), _stem(t)) for t in raw if len(t) > 1 and t not in STOPWORDS]
+        return tokens, raw
+
+    def add(self, code, keyword):
+        """Add a keyword phrase for an HS code; the table can be extended at runtime"""
+        tokens, _ = self._tokens(keyword)
+        if not tokens:
+            return
+        phrase_id = len(self.phrases)
+        self.phrases.append((code, tuple(tokens)))
+        for token in set(tokens):
+            if token not in self.inverted:
+                for gram in _trigrams(token):
+                    self.trigram_index.setdefault(gram, set()).add(token)
+            self.inverted.setdefault(token, set()).add(phrase_id)
+        self._idf = None
+
+    def _token_idf(self):
+        if self._idf is None:
+            total = len(self.phrases)
+            self._idf = {token: math.log(1 + total / len(ids)) for token, ids in self.inverted.items()}
+        return self._idf
+
+    def _fuzzy(self, token):
+        """Closest vocabulary token and its similarity, or (None, 0.0)"""
+        if len(token) < 4:
+            return None, 0.0
+        candidates = set()
+        for gram in _trigrams(token):
+            candidates.update(self.trigram_index.get(gram, ()))
+
+        best, best_ratio = None, 0.0
+        for candidate in candidates:
+            ratio = difflib.SequenceMatcher(None, token, candidate).ratio()
+            if ratio > best_ratio:
+                best, best_ratio = candidate, ratio
+        if best_ratio < FUZZY_MIN_SIMILARITY:
+            return None, 0.0
+        return best, best_ratio
+
+    def _match_tokens(self, text, weight, matched):
+        tokens, raw = self._tokens(text)
+        # Adjacent tokens joined together, e.g. "tooth brush" or "t-shirt"
+        joined = [self.canonical.get(_stem(a + b), _stem(a + b)) for a, b in zip(raw, raw[1:])]
+
+        for token in tokens + [t for t in joined if t in self.inverted]:
+            if token in self.inverted:
+                similarity = 1.0
+            else:
+                token, similarity = self._fuzzy(token)
+                if token is None:
+                    continue
+            matched[token] = max(matched.get(token, 0.0), weight * similarity)
+
+    def _name_units(self, product_name):
+        """The product name's tokens, each with the vocabulary token it resolves to (or None)"""
+        _, raw = self._tokens(product_name)
+        units = [
+            [self.canonical.get(_stem(t), _stem(t)), None]
+            for t in raw if len(t) > 1 and t not in STOPWORDS
+        ]
+        for unit in units:
+            if unit[0] in self.inverted:
+                unit[1] = unit[0]
+            else:
+                unit[1], _ = self._fuzzy(unit[0])
+
+        # Both halves of a split word ("tooth brush") are explained by the joined token
+        by_token = {}
+        for unit in units:
+            by_token.setdefault(unit[0], []).append(unit)
+        for a, b in zip(raw, raw[1:]):
+            joined = self.canonical.get(_stem(a + b), _stem(a + b))
+            if joined in self.inverted:
+                for part in (a, b):
+                    for unit in by_token.get(self.canonical.get(_stem(part), _stem(part)), []):
+                        unit[1] = unit[1] if unit[1] in self.inverted and unit[1] != unit[0] else joined
+        return units
+
+    def _name_coverage(self, product_name, code):
+        """Idf-weighted share of the product name explained by the code's keyword phrases.
+
+        Tokens the table has never seen weigh as much as the rarest known
+        token. Unexplained words after the last explained one are taken as the
+        head noun ("toothpaste dispenser", "candle holder") and count in full;
+        those before it are modifiers ("organic bamboo toothbrush") and count
+        at MODIFIER_WEIGHT.
+        """
+        units = self._name_units(product_name)
+        if not units:
+            return 1.0
+        idf = self._token_idf()
+        unseen = max(idf.values())
+        code_tokens = {t for phrase_code, tokens in self.phrases if phrase_code == code for t in tokens}
+        explained_at = [i for i, (_, resolved) in enumerate(units) if resolved in code_tokens]
+        if not explained_at:
+            return 0.0
+
+        total = explained = 0.0
+        for i, (token, resolved) in enumerate(units):
+            weight = idf.get(resolved, unseen) if resolved else unseen
+            if resolved in code_tokens:
+                explained += weight
+            elif i < explained_at[-1]:
+                weight *= MODIFIER_WEIGHT
+            total += weight
+        return explained / total
+
+    def classify(self, product_name, description=""):
+        """Return (hs_code, confidence) for the best match, or (None, 0.0)"""
+        matched = {}
+        self._match_tokens(description, DESCRIPTION_WEIGHT, matched)
+        self._match_tokens(product_name, 1.0, matched)
+        if not matched:
+            return None, 0.0
+
+        idf = self._token_idf()
+        candidates = set()
+        for token in matched:
+            candidates.update(self.inverted[token])
+
+        # Best (coverage, matched mass) per code over its keyword phrases
+        best_by_code = {}
+        for phrase_id in candidates:
+            code, tokens = self.phrases[phrase_id]
+            total = sum(idf[t] for t in tokens)
+            mass = sum(idf[t] * matched.get(t, 0.0) for t in tokens)
+            if (mass / total, mass) > best_by_code.get(code, (0.0, 0.0)):
+                best_by_code[code] = (mass / total, mass)
+
+        # Prefer more specific phrases when coverage ties, e.g. "electric toothbrush"
+        max_mass = max(mass for _, mass in best_by_code.values())
+        scores = sorted(
+            ((coverage * (0.7 + 0.3 * mass / max_mass), code) for code, (coverage, mass) in best_by_code.items()),
+            reverse=True
+        )
+
+        best_score, best_code = scores[0]
+        runner_up = scores[1][0] if len(scores) > 1 else 0.0
+        confidence = best_score * (1 - 0.5 * (runner_up / best_score) ** 2) * self._name_coverage(product_name, best_code)
+        return best_code, round(confidence, 3)
+
+
+_hs_index = None
+_hs_index_lock = threading.Lock()
+
+
+def get_hs_index():
+    """Process-wide HSCodeIndex built from the HS code table"""
+    global _hs_index
+    with _hs_index_lock:
+        if _hs_index is None:
+            _hs_index = HSCodeIndex.from_file()
+        return _hs_index
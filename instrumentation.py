@@ -0,0 +1,306 @@
+import contextvars
+import json
+import math
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from config import METRICS_WINDOW, METRICS_LOG_PATH, METRICS_PROMETHEUS_PATH
+from prompt_compaction import estimate_tokens
+
+# Annotations for the call in progress (cache status, queue wait), set by the
+# cache and outbound layers and read by whichever wrapper records the call
+_call_context = contextvars.ContextVar("call_context", default={})
+_current_analysis = contextvars.ContextVar("current_analysis", default=None)
+
+
+@contextmanager
+def call_context(**annotations):
+    """Annotate every call recorded inside the block"""
+    token = _call_context.set({**_call_context.get(), **annotations})
+    try:
+        yield
+    finally:
+        _call_context.reset(token)
+
+
+def current_call_context():
+    """Annotations in effect for calls recorded here"""
+    return _call_context.get()
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of a list of numbers (q between 0 and 1)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+
+def result_size(value):
+    """Size of a call's result in characters"""
+    if value is None:
+        return 0
+    if isinstance(value, str):
+        return len(value)
+    return len(json.dumps(value, default=str))
+
+
+class MetricsCollector:
+    """Thread-safe call records with per-name breakdowns.
+
+    Running totals cover every call; percentiles use the last `window` calls
+    of each name.
+    """
+
+    def __init__(self, window=METRICS_WINDOW):
+        self.window = window
+        self.records = deque(maxlen=window)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def add(self, record):
+        key = (record["name"], record["kind"])
+        with self._lock:
+            self.records.append(record)
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {
+                    "durations": deque(maxlen=self.window),
+                    "calls": 0,
+                    "errors": 0,
+                    "wall_seconds": 0.0,
+                    "queue_wait_seconds": 0.0,
+                    "prompt_tokens": 0,
+                    "completion_tokens": 0,
+                    "result_size": 0,
+                    "cache": {}
+                }
+            series["durations"].append(record["wall_seconds"])
+            series["calls"] += 1
+            series["errors"] += record["error"] is not None
+            series["wall_seconds"] += record["wall_seconds"]
+            series["queue_wait_seconds"] += record["queue_wait_seconds"]
+            series["prompt_tokens"] += record["prompt_tokens"]
+            series["completion_tokens"] += record["completion_tokens"]
+            series["result_size"] += record["result_size"]
+            if record["cache"]:
+                series["cache"][record["cache"]] = series["cache"].get(record["cache"], 0) + 1
+
+    def breakdown(self):
+        """Per-name totals with p50/p95 wall time"""
+        with self._lock:
+            return {
+                name: {
+                    "kind": kind,
+                    "calls": series["calls"],
+                    "errors": series["errors"],
+                    "wall_seconds_total": round(series["wall_seconds"], 6),
+                    "wall_seconds_p50": round(percentile(series["durations"], 0.5), 6),
+                    "wall_seconds_p95": round(percentile(series["durations"], 0.95), 6),
+                    "queue_wait_seconds_total": round(series["queue_wait_seconds"], 6),
+                    "prompt_tokens": series["prompt_tokens"],
+                    "completion_tokens": series["completion_tokens"],
+                    "result_size_total": series["result_size"],
+                    "cache": dict(series["cache"])
+                }
+                for (name, kind), series in self._series.items()
+            }
+
+    def to_json_lines(self):
+        """One JSON object per recorded call"""
+        with self._lock:
+            records = list(self.records)
+        return "".join(json.dumps(record, default=str) + "\n" for record in records)
+
+    def to_prometheus(self, prefix="market_agent"):
+        """Prometheus text exposition format, one series per call name"""
+        lines = [
+            f"# HELP {prefix}_call_duration_seconds Wall time per call",
+            f"# TYPE {prefix}_call_duration_seconds summary"
+        ]
+        counters = [
+            ("queue_wait_seconds_total", "queue_wait_seconds_total", "Time spent waiting on rate limits and backoff"),
+            ("prompt_tokens_total", "prompt_tokens", "Prompt tokens sent"),
+            ("completion_tokens_total", "completion_tokens", "Completion tokens received"),
+            ("result_size_chars_total", "result_size_total", "Characters returned"),
+            ("call_errors_total", "errors", "Calls that raised")
+        ]
+        breakdown = self.breakdown()
+        for name, stats in sorted(breakdown.items()):
+            labels = f'name="{name}",kind="{stats["kind"]}"'
+            lines += [
+                f'{prefix}_call_duration_seconds{{{labels},quantile="0.5"}} {stats["wall_seconds_p50"]}',
+                f'{prefix}_call_duration_seconds{{{labels},quantile="0.95"}} {stats["wall_seconds_p95"]}',
+                f"{prefix}_call_duration_seconds_sum{{{labels}}} {stats['wall_seconds_total']}",
+                f"{prefix}_call_duration_seconds_count{{{labels}}} {stats['calls']}"
+            ]
+        for metric, field, description in counters:
+            lines += [f"# HELP {prefix}_{metric} {description}", f"# TYPE {prefix}_{metric} counter"]
+            for name, stats in sorted(breakdown.items()):
+                lines.append(f'{prefix}_{metric}{{name="{name}",kind="{stats["kind"]}"}} {stats[field]}')
+        lines += [f"# HELP {prefix}_cache_lookups_total Cache lookups by status", f"# TYPE {prefix}_cache_lookups_total counter"]
+        for name, stats in sorted(breakdown.items()):
+            for status, count in sorted(stats["cache"].items()):
+                lines.append(f'{prefix}_cache_lookups_total{{name="{name}",kind="{stats["kind"]}",status="{status}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+
+class AnalysisMetrics(MetricsCollector):
+    """Calls made while analyzing one product"""
+
+    def __init__(self, label):
+        super().__init__(window=None)
+        self.analysis_id = uuid.uuid4().hex[:12]
+        self.label = label
+        self.started = time.time()
+        self.wall_seconds = None
+
+    def summary(self):
+        return {
+            "analysis_id": self.analysis_id,
+            "label": self.label,
+            "wall_seconds": self.wall_seconds,
+            "calls": self.breakdown()
+        }
+
+
+# Process-wide collector; every recorded call lands here as well as in its analysis
+metrics = MetricsCollector()
+
+
+def current_analysis():
+    return _current_analysis.get()
+
+
+@contextmanager
+def track_analysis(label):
+    """Collect the calls made inside the block, including those on worker threads
+    started through task_runner, into one AnalysisMetrics"""
+    analysis = AnalysisMetrics(label)
+    token = _current_analysis.set(analysis)
+    started = time.perf_counter()
+    try:
+        yield analysis
+    finally:
+        analysis.wall_seconds = round(time.perf_counter() - started, 6)
+        _current_analysis.reset(token)
+        export_analysis(analysis)
+
+
+def export_analysis(analysis):
+    """Append the analysis' calls to METRICS_LOG_PATH and rewrite METRICS_PROMETHEUS_PATH, when set"""
+    try:
+        if METRICS_LOG_PATH:
+            with open(METRICS_LOG_PATH, "a") as f:
+                f.write(analysis.to_json_lines())
+        if METRICS_PROMETHEUS_PATH:
+            # Write then rename so a scraper never reads a half-written file
+            temp_path = f"{METRICS_PROMETHEUS_PATH}.tmp"
+            with open(temp_path, "w") as f:
+                f.write(metrics.to_prometheus())
+            os.replace(temp_path, METRICS_PROMETHEUS_PATH)
+    except OSError as e:
+        print(f"Error exporting metrics: {e}")
+
+
+def record_call(name, kind, wall_seconds, prompt_tokens=0, completion_tokens=0, size=0,
+                cache=None, error=None, context=None):
+    """Record one call; context defaults to the current call annotations"""
+    context = _call_context.get() if context is None else context
+    analysis = _current_analysis.get()
+    record = {
+        "timestamp": time.time(),
+        "analysis_id": analysis.analysis_id if analysis else None,
+        "name": name,
+        "kind": kind,
+        "wall_seconds": round(wall_seconds, 6),
+        "queue_wait_seconds": round(context.get("queue_wait", 0.0), 6),
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "result_size": size,
+        "cache": cache or context.get("cache"),
+        "error": None if error is None else f"{type(error).__name__}: {error}"
+    }
+    metrics.add(record)
+    if analysis is not None:
+        analysis.add(record)
+    return record
+
+
+def _gemini_usage(response, prompt, text):
+    """(prompt_tokens, completion_tokens), from usage metadata when the SDK reports it"""
+    usage = getattr(response, "usage_metadata", None)
+    if usage is not None and getattr(usage, "prompt_token_count", None):
+        return usage.prompt_token_count, getattr(usage, "candidates_token_count", 0) or 0
+    return estimate_tokens(str(prompt)), estimate_tokens(text)
+
+
+class InstrumentedGeminiModel:
+    """Wraps a google.generativeai GenerativeModel and records each generate_content call"""
+
+    def __init__(self, model, name="gemini"):
+        self.model = model
+        self.name = name
+
+    def generate_content(self, prompt, **kwargs):
+        context = _call_context.get()
+        started = time.perf_counter()
+        try:
+            response = self.model.generate_content(prompt, **kwargs)
+        except Exception as e:
+            record_call(self.name, "llm", time.perf_counter() - started, error=e, context=context)
+            raise
+
+        if kwargs.get("stream"):
+            return self._stream(response, prompt, started, context)
+
+        text = response.text
+        prompt_tokens, completion_tokens = _gemini_usage(response, prompt, text)
+        record_call(self.name, "llm", time.perf_counter() - started, prompt_tokens, completion_tokens,
+                    len(text), context=context)
+        return response
+
+    def _stream(self, response, prompt, started, context):
+        """Pass chunks through, recording the call once the stream ends"""
+        parts = []
+        chunk = None
+        try:
+            for chunk in response:
+                parts.append(chunk.text)
+                yield chunk
+        except Exception as e:
+            record_call(self.name, "llm", time.perf_counter() - started, error=e, context=context)
+            raise
+        text = "".join(parts)
+        prompt_tokens, completion_tokens = _gemini_usage(chunk, prompt, text)
+        record_call(self.name, "llm", time.perf_counter() - started, prompt_tokens, completion_tokens,
+                    len(text), context=context)
+
+    def __getattr__(self, attr):
+        return getattr(self.model, attr)
+
+
+class InstrumentedTavilyClient:
+    """Wraps a TavilyClient and records each search call"""
+
+    def __init__(self, client, name="tavily"):
+        self.client = client
+        self.name = name
+
+    def search(self, query, **kwargs):
+        context = _call_context.get()
+        started = time.perf_counter()
+        try:
+            response = self.client.search(query=query, **kwargs)
+        except Exception as e:
+            record_call(self.name, "search", time.perf_counter() - started, error=e, context=context)
+            raise
+        record_call(self.name, "search", time.perf_counter() - started, size=result_size(response.get("results")),
+                    context=context)
+        return response
+
+    def __getattr__(self, attr):
+        return getattr(self.client, attr)
@@ -3,14 +3,95 @@ from langchain_community.tools.tavily_search import TavilySearchResults
 from langchain.agents import AgentExecutor, create_openai_tools_agent
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.messages import HumanMessage, AIMessage
+from langchain_core.language_models.chat_models import BaseChatModel
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.runnables import RunnablePassthrough
-from langchain.tools import tool
+from langchain.tools import StructuredTool, Tool
 from langchain_core.pydantic_v1 import BaseModel, Field
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator
+import asyncio
+import functools
+import hashlib
 import json
 from datetime import datetime
 from config import *
+from cache import get_search_cache, get_llm_cache
+from outbound import call_provider, acall_provider
+from hs_classifier import get_hs_index
+from tariff_store import get_tariff_store
+from prompt_compaction import compact
+from task_runner import run_graph, run_parallel
+from instrumentation import track_analysis
+from langchain_metrics import MetricsCallbackHandler
+from budget_governor import BudgetExceeded, BudgetGovernor
+from section_store import SectionRefresher
+from report_engine import COMPREHENSIVE_REPORT_SECTIONS, ReportEngine
+from translation import ListingTranslator, listing_languages
+
+# Records every tool run, whether the agent or the pipeline invoked it
+tool_metrics = MetricsCallbackHandler()
+
+# Search queries behind the tools, shared with the section store's freshness checks
+MARKET_SIZE_QUERY = "market size {product_name} sustainable eco-friendly {country} 2024"
+MARKET_TARIFF_QUERY = "tariff rate HS code {hs_code} {country} 2024 import duty"
+MARKET_COMPETITOR_QUERY = "competitors {product_name} sustainable {country} Amazon marketplace"
+TARIFF_QUERY = "tariff rate HS code {hs_code} {country} 2024 import duty customs"
+COMPETITOR_QUERY = "competitors {product_name} sustainable eco-friendly {country} 2024 market leaders"
+INCENTIVES_QUERY = "government incentives export {product_category} {country} 2024"
+DEFAULT_PRODUCT_CATEGORY = "sustainable products"
+
+# Final output AgentExecutor returns when max_iterations or max_execution_time stops it
+AGENT_STOPPED_OUTPUT = "Agent stopped due to iteration limit or time limit."
+
+def tool_factory(factory):
+    """Turn a method that builds a tool function into one that returns it as a LangChain tool.
+    
+    The method may also return (func, coroutine) to give the tool a native async path.
+    """
+    @functools.wraps(factory)
+    def build(self):
+        func = factory(self)
+        func, coroutine = func if isinstance(func, tuple) else (func, None)
+        return StructuredTool.from_function(
+            func=func, coroutine=coroutine, name=func.__name__, description=factory.__doc__, callbacks=[tool_metrics]
+        )
+    return build
+
+class ProviderChatModel(BaseChatModel):
+    """Chat model whose calls to the wrapped model go through an outbound provider.
+    
+    Tool LLM calls already pass through the provider via the LLM cache; this
+    puts the agent executor's planning turns under the same rate limit,
+    backoff and coalescing. Identical concurrent turns share one call.
+    """
+    model: BaseChatModel
+    provider: str = "gemini"
+    
+    @property
+    def _llm_type(self) -> str:
+        return f"{self.model._llm_type}-via-{self.provider}"
+    
+    def _call_key(self, messages, stop, kwargs) -> str:
+        payload = json.dumps(
+            [self._llm_type, getattr(self.model, "model", None), getattr(self.model, "temperature", None),
+             [message.dict() for message in messages], stop, kwargs],
+            sort_keys=True, default=str
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        return call_provider(
+            self.provider,
+            lambda: self.model._generate(messages, stop=stop, run_manager=run_manager, **kwargs),
+            key=self._call_key(messages, stop, kwargs)
+        )
+    
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        return await acall_provider(
+            self.provider,
+            lambda: self.model._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs),
+            key=self._call_key(messages, stop, kwargs)
+        )
 
 class MarketAnalysisInput(BaseModel):
     product_name: str = Field(description="Name of the product to analyze")
@@ -18,23 +99,23 @@ class MarketAnalysisInput(BaseModel):
     target_countries: List[str] = Field(description="List of target countries", default=["Germany", "UAE", "Canada"])
 
 class GlobalMarketEntryAgent:
-    def __init__(self):
-        # Initialize LangChain with Gemini
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-pro",
-            google_api_key=GEMINI_API_KEY,
-            temperature=0.3
-        )
+    def __init__(self, bypass_llm_cache: bool = False, llm: ChatGoogleGenerativeAI = None,
+                 search_tool: TavilySearchResults = None):
+        # Clients can be passed in so that pooled agents share them
+        self.llm = llm or self.create_llm()
+        self.bypass_llm_cache = bypass_llm_cache
+        self.search_tool = search_tool or self.create_search_tool()
+        # Per-call timings, tokens and cache status of the most recent analysis
+        self.last_analysis_metrics = None
         
-        # Initialize Tavily search tool
-        self.search_tool = TavilySearchResults(
-            api_key=TAVILY_API_KEY,
-            max_results=5
-        )
-        
-        # Create tools
+        # Create tools; the agent's own searches also go through the cache and outbound policy
         self.tools = [
-            self.search_tool,
+            Tool.from_function(
+                func=self._search,
+                name=self.search_tool.name,
+                description=self.search_tool.description,
+                callbacks=[tool_metrics]
+            ),
             self._get_hs_code_tool(),
             self._analyze_market_tool(),
             self._get_tariff_info_tool(),
@@ -43,6 +124,10 @@ class GlobalMarketEntryAgent:
             self._translate_product_tool(),
             self._get_government_incentives_tool()
         ]
+        self.tools_by_name = {tool.name: tool for tool in self.tools}
+        
+        # Comprehensive report, written section by section
+        self.report_engine = ReportEngine(COMPREHENSIVE_REPORT_SECTIONS, self._invoke_llm, self._stream_llm)
         
         # Create agent prompt
         self.prompt = ChatPromptTemplate.from_messages([
@@ -63,9 +148,10 @@ Always provide actionable, data-driven insights with specific recommendations.""
             MessagesPlaceholder(variable_name="agent_scratchpad"),
         ])
         
-        # Create agent
+        # Create agent; its planning turns go through the Gemini provider like every other LLM call
+        self.planner_llm = ProviderChatModel(model=self.llm, callbacks=self.llm.callbacks)
         self.agent = create_openai_tools_agent(
-            llm=self.llm,
+            llm=self.planner_llm,
             tools=self.tools,
             prompt=self.prompt
         )
@@ -74,13 +160,39 @@ Always provide actionable, data-driven insights with specific recommendations.""
             agent=self.agent,
             tools=self.tools,
             verbose=True,
-            handle_parsing_errors=True
+            handle_parsing_errors=True,
+            max_iterations=AGENT_MAX_ITERATIONS,
+            max_execution_time=ANALYSIS_MAX_SECONDS
+        )
+    
+    @staticmethod
+    def create_llm() -> ChatGoogleGenerativeAI:
+        """Initialize LangChain with Gemini"""
+        return ChatGoogleGenerativeAI(
+            model="gemini-pro",
+            google_api_key=GEMINI_API_KEY,
+            temperature=0.3,
+            callbacks=[MetricsCallbackHandler()]
+        )
+    
+    @staticmethod
+    def create_search_tool() -> TavilySearchResults:
+        """Initialize Tavily search tool"""
+        return TavilySearchResults(
+            api_key=TAVILY_API_KEY,
+            max_results=5,
+            callbacks=[MetricsCallbackHandler(name="tavily", kind="search")]
         )
     
-    @tool
+    @tool_factory
     def _get_hs_code_tool(self):
         """Determine the appropriate HS code for a product"""
         def get_hs_code(product_name: str, description: str = "") -> str:
+            # Resolve locally first; only ask the model when the index isn't confident
+            hs_code, confidence = get_hs_index().classify(product_name, description)
+            if hs_code and confidence >= HS_CLASSIFIER_MIN_CONFIDENCE:
+                return hs_code
+            
             prompt = f"""
             Analyze this product and determine the most appropriate HS code:
             Product: {product_name}
@@ -92,8 +204,8 @@ Always provide actionable, data-driven insights with specific recommendations.""
             If not found in mappings, analyze the product and suggest the most appropriate HS code.
             """
             
-            response = self.llm.invoke(prompt)
-            hs_code = response.content.strip()
+            response = self._invoke_llm(prompt)
+            hs_code = response.strip()
             
             # Fallback to mapping if AI doesn't return valid format
             if len(hs_code) != 6 or not hs_code.isdigit():
@@ -106,48 +218,90 @@ Always provide actionable, data-driven insights with specific recommendations.""
         
         return get_hs_code
     
-    @tool
+    @tool_factory
     def _analyze_market_tool(self):
         """Analyze market potential for a product in specific countries"""
-        def analyze_market(product_name: str, hs_code: str, countries: List[str]) -> Dict[str, Any]:
-            market_data = {}
+        async def aanalyze_market(product_name: str, hs_code: str, countries: List[str]) -> Dict[str, Any]:
+            # Every search + summary pair runs concurrently, bounded by MAX_CONCURRENCY;
+            # whatever hasn't finished by the deadline is reported as unavailable
+            semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+            
+            async def research(query, context):
+                async with semaphore:
+                    results = await self._asearch(query)
+                async with semaphore:
+                    return await self._aanalyze_search_results(results, context)
             
+            market_data = {}
+            fields = {}
             for country in countries:
-                # Get market size
-                market_size_query = f"market size {product_name} sustainable eco-friendly {country} 2024"
-                market_size_results = self.search_tool.invoke(market_size_query)
-                
-                # Get tariff info
-                tariff_query = f"tariff rate HS code {hs_code} {country} 2024 import duty"
-                tariff_results = self.search_tool.invoke(tariff_query)
-                
-                # Get competitor info
-                competitor_query = f"competitors {product_name} sustainable {country} Amazon marketplace"
-                competitor_results = self.search_tool.invoke(competitor_query)
-                
                 market_data[country] = {
-                    "market_size": self._analyze_search_results(market_size_results, f"market size for {product_name} in {country}"),
-                    "tariff_rate": self._analyze_search_results(tariff_results, f"tariff rate for HS code {hs_code} in {country}"),
-                    "competitors": self._analyze_search_results(competitor_results, f"competitors for {product_name} in {country}"),
                     "entry_channels": self._get_entry_channels(country),
                     "regulations": self._get_regulations(product_name, country),
                     "incentives": GOVERNMENT_INCENTIVES.get(country, {})
                 }
+                
+                # Get tariff info, from the local tariff table when it has the pair
+                tariff_record = get_tariff_store().lookup_record(hs_code, country)
+                if tariff_record:
+                    market_data[country]["tariff_rate"] = self._describe_tariff_record(tariff_record)
+                else:
+                    fields[(country, "tariff_rate")] = research(
+                        MARKET_TARIFF_QUERY.format(hs_code=hs_code, country=country),
+                        f"tariff rate for HS code {hs_code} in {country}"
+                    )
+                
+                fields[(country, "market_size")] = research(
+                    MARKET_SIZE_QUERY.format(product_name=product_name, country=country),
+                    f"market size for {product_name} in {country}"
+                )
+                fields[(country, "competitors")] = research(
+                    MARKET_COMPETITOR_QUERY.format(product_name=product_name, country=country),
+                    f"competitors for {product_name} in {country}"
+                )
+            
+            tasks = {asyncio.ensure_future(coroutine): key for key, coroutine in fields.items()}
+            if tasks:
+                done, pending = await asyncio.wait(tasks, timeout=MARKET_TOOL_DEADLINE_SECONDS)
+                for task in pending:
+                    task.cancel()
+                for task, (country, field) in tasks.items():
+                    if task in pending:
+                        print(f"analyze_market: {field} for {country} missed the {MARKET_TOOL_DEADLINE_SECONDS}s deadline")
+                        market_data[country][field] = f"Not available (analysis deadline of {MARKET_TOOL_DEADLINE_SECONDS:g}s exceeded)"
+                    elif task.exception() is not None:
+                        print(f"analyze_market: {field} for {country} failed: {task.exception()}")
+                        market_data[country][field] = f"Not available ({task.exception()})"
+                    else:
+                        market_data[country][field] = task.result()
             
             return market_data
         
-        return analyze_market
+        def analyze_market(product_name: str, hs_code: str, countries: List[str]) -> Dict[str, Any]:
+            return asyncio.run(aanalyze_market(product_name, hs_code, countries))
+        
+        return analyze_market, aanalyze_market
     
-    @tool
+    @tool_factory
     def _get_tariff_info_tool(self):
         """Get detailed tariff information for a product in specific countries"""
         def get_tariff_info(hs_code: str, country: str) -> Dict[str, Any]:
-            search_query = f"tariff rate HS code {hs_code} {country} 2024 import duty customs"
-            results = self.search_tool.invoke(search_query)
+            tariff_record = get_tariff_store().lookup_record(hs_code, country)
+            if tariff_record:
+                return {
+                    "country": country,
+                    "hs_code": hs_code,
+                    "analysis": self._describe_tariff_record(tariff_record),
+                    "raw_data": tariff_record,
+                    "source": "local_tariff_table"
+                }
+            
+            search_query = TARIFF_QUERY.format(hs_code=hs_code, country=country)
+            results = self._search(search_query)
             
             analysis_prompt = f"""
             Based on this search data, provide detailed tariff information for HS code {hs_code} in {country}:
-            {results}
+            {compact(results, f"tariff rate import duty customs trade agreement HS code {hs_code} {country}")}
             
             Return a structured analysis including:
             - Tariff rate percentage
@@ -156,26 +310,26 @@ Always provide actionable, data-driven insights with specific recommendations.""
             - Documentation requirements
             """
             
-            response = self.llm.invoke(analysis_prompt)
+            response = self._invoke_llm(analysis_prompt)
             return {
                 "country": country,
                 "hs_code": hs_code,
-                "analysis": response.content,
+                "analysis": response,
                 "raw_data": results
             }
         
         return get_tariff_info
     
-    @tool
+    @tool_factory
     def _get_competitor_analysis_tool(self):
         """Analyze competitors for a product in specific markets"""
         def get_competitor_analysis(product_name: str, country: str) -> Dict[str, Any]:
-            search_query = f"competitors {product_name} sustainable eco-friendly {country} 2024 market leaders"
-            results = self.search_tool.invoke(search_query)
+            search_query = COMPETITOR_QUERY.format(product_name=product_name, country=country)
+            results = self._search(search_query)
             
             analysis_prompt = f"""
             Based on this search data, provide a comprehensive competitor analysis for {product_name} in {country}:
-            {results}
+            {compact(results, f"competitors brands prices market share {product_name} {country}")}
             
             Include:
             - Top 5 competitors
@@ -185,17 +339,17 @@ Always provide actionable, data-driven insights with specific recommendations.""
             - Market share estimates
             """
             
-            response = self.llm.invoke(analysis_prompt)
+            response = self._invoke_llm(analysis_prompt)
             return {
                 "product": product_name,
                 "country": country,
-                "analysis": response.content,
+                "analysis": response,
                 "raw_data": results
             }
         
         return get_competitor_analysis
     
-    @tool
+    @tool_factory
     def _generate_recommendations_tool(self):
         """Generate strategic recommendations based on market analysis"""
         def generate_recommendations(market_data: Dict[str, Any], product_name: str) -> Dict[str, Any]:
@@ -217,52 +371,46 @@ Always provide actionable, data-driven insights with specific recommendations.""
             Format as a structured strategic plan.
             """
             
-            response = self.llm.invoke(prompt)
+            response = self._invoke_llm(prompt)
             return {
                 "product": product_name,
-                "recommendations": response.content,
+                "recommendations": response,
                 "timestamp": datetime.now().isoformat()
             }
         
         return generate_recommendations
     
-    @tool
+    @tool_factory
     def _translate_product_tool(self):
-        """Translate product listing for target markets"""
-        def translate_product(product_name: str, description: str, target_language: str = "German") -> Dict[str, str]:
-            prompt = f"""
-            Translate this product listing to {target_language}:
-            
-            Product Name: {product_name}
-            Description: {description}
-            
-            Make it culturally appropriate for {target_language} speakers and optimize for e-commerce platforms.
-            Include relevant keywords for sustainability and eco-friendly products.
-            Provide both the translated name and description.
-            """
-            
-            response = self.llm.invoke(prompt)
+        """Translate product listing into the languages of the target markets in one batch"""
+        def translate_product(product_name: str, description: str, target_languages: List[str]) -> Dict[str, Any]:
+            translations = ListingTranslator(self._invoke_llm).translate(product_name, description, target_languages)
             return {
                 "original_name": product_name,
                 "original_description": description,
-                "translated_name": response.content.split("\n")[0] if "\n" in response.content else response.content,
-                "translated_description": response.content,
-                "target_language": target_language
+                "translations": {
+                    language: {
+                        "translated_name": translation["name"],
+                        "translated_description": translation["description"]
+                    }
+                    for language, translation in translations.items()
+                },
+                "missing_languages": [language for language in target_languages if language not in translations]
             }
         
         return translate_product
     
-    @tool
+    @tool_factory
     def _get_government_incentives_tool(self):
         """Get government incentives for export to specific countries"""
-        def get_government_incentives(country: str, product_category: str = "sustainable products") -> Dict[str, Any]:
-            search_query = f"government incentives export {product_category} {country} 2024"
-            results = self.search_tool.invoke(search_query)
+        def get_government_incentives(country: str, product_category: str = DEFAULT_PRODUCT_CATEGORY) -> Dict[str, Any]:
+            search_query = INCENTIVES_QUERY.format(product_category=product_category, country=country)
+            results = self._search(search_query)
             
             analysis_prompt = f"""
             Based on this search data and our database, provide government incentives for exporting {product_category} to {country}:
             
-            Search Results: {results}
+            Search Results: {compact(results, f"government incentives programs funding export {product_category} {country}")}
             Database Incentives: {GOVERNMENT_INCENTIVES.get(country, {})}
             
             Provide a comprehensive list of:
@@ -273,29 +421,95 @@ Always provide actionable, data-driven insights with specific recommendations.""
             - Contact information
             """
             
-            response = self.llm.invoke(analysis_prompt)
+            response = self._invoke_llm(analysis_prompt)
             return {
                 "country": country,
                 "product_category": product_category,
-                "incentives": response.content,
+                "incentives": response,
                 "database_incentives": GOVERNMENT_INCENTIVES.get(country, {}),
                 "search_results": results
             }
         
         return get_government_incentives
     
+    def _invoke_llm(self, prompt: str, bypass_cache: bool = None) -> str:
+        """Invoke the LLM, reusing cached answers for identical prompts"""
+        if bypass_cache is None:
+            bypass_cache = self.bypass_llm_cache
+        
+        return get_llm_cache().fetch(
+            self.llm.model,
+            self.llm.temperature,
+            prompt,
+            lambda: self.llm.invoke(prompt).content,
+            bypass=bypass_cache
+        )
+    
+    def _search(self, query: str, bypass_cache: bool = False) -> Any:
+        """Run the Tavily search tool through the shared search cache"""
+        def run_search():
+            results = self.search_tool.invoke(query)
+            # The tool reports failures as a string; raise so they aren't cached
+            if isinstance(results, str):
+                raise RuntimeError(results)
+            return results
+        
+        try:
+            return get_search_cache().fetch(
+                query,
+                run_search,
+                search_depth="advanced",
+                max_results=self.search_tool.max_results,
+                bypass=bypass_cache
+            )
+        except RuntimeError as e:
+            return str(e)
+    
+    async def _asearch(self, query: str) -> Any:
+        """_search for coroutines, using the search tool's async client"""
+        async def run_search():
+            results = await self.search_tool.ainvoke(query)
+            if isinstance(results, str):
+                raise RuntimeError(results)
+            return results
+        
+        try:
+            return await get_search_cache().afetch(
+                query,
+                run_search,
+                search_depth="advanced",
+                max_results=self.search_tool.max_results
+            )
+        except RuntimeError as e:
+            return str(e)
+    
     def _analyze_search_results(self, results: List[Dict], context: str) -> str:
         """Analyze search results using LLM"""
-        prompt = f"""
+        return self._invoke_llm(self._search_results_prompt(results, context))
+    
+    async def _aanalyze_search_results(self, results: List[Dict], context: str) -> str:
+        """_analyze_search_results for coroutines.
+        
+        The model's async gRPC client stays bound to the first event loop it
+        runs on, and the sync tool path starts a new loop on every call, so the
+        summary runs on the sync client in a worker thread instead.
+        """
+        return await asyncio.to_thread(self._analyze_search_results, results, context)
+    
+    def _search_results_prompt(self, results: List[Dict], context: str) -> str:
+        """Prompt summarizing search results for one question"""
+        return f"""
         Based on this search data, provide insights for: {context}
         
-        Search Results: {results}
+        Search Results: {compact(results, context)}
         
         Provide a concise, actionable summary.
         """
-        
-        response = self.llm.invoke(prompt)
-        return response.content
+    
+    def _describe_tariff_record(self, record: Dict[str, Any]) -> str:
+        """Summarize a local tariff table entry"""
+        rate = "duty-free" if record["rate"] == 0 else f"{record['rate']}% import duty"
+        return f"HS code {record['hs_code']} in {record['country']}: {rate} (local tariff table, updated {record['updated']})"
     
     def _get_entry_channels(self, country: str) -> List[str]:
         """Get market entry channels for specific country"""
@@ -351,12 +565,58 @@ Always provide actionable, data-driven insights with specific recommendations.""
         
         return regulations.get(country, ["Standard import regulations apply"])
     
-    def analyze_product(self, product_name: str, product_description: str = "", target_countries: List[str] = None) -> Dict[str, Any]:
-        """Main method to analyze a product for global market entry"""
+    def analyze_product(self, product_name: str, product_description: str = "", target_countries: List[str] = None,
+                        mode: str = None, reuse_sections: bool = False) -> Dict[str, Any]:
+        """Main method to analyze a product for global market entry.
+        
+        mode "agent" lets the model choose tools step by step; "pipeline" runs
+        the same tools as a fixed dependency graph. Defaults to LANGCHAIN_ANALYSIS_MODE.
+        Runs are held to the ANALYSIS_MAX_* budgets; one that runs out returns
+        what it has so far with "truncated" set and the reason in "truncation_reason".
+        Pipeline runs also store their sections for reanalyze_product.
+        """
         
         if target_countries is None:
             target_countries = ["Germany", "UAE", "Canada"]
         
+        mode = mode or LANGCHAIN_ANALYSIS_MODE
+        if mode not in ("agent", "pipeline"):
+            raise ValueError(f"Unknown analysis mode: {mode!r}")
+        
+        sections = None
+        with track_analysis(product_name) as metrics:
+            if mode == "pipeline":
+                # The pipeline's tool calls are fixed by the graph, so only time and tokens are capped
+                governor = BudgetGovernor(max_tool_calls=None, analysis=metrics)
+                sections = SectionRefresher(reuse=reuse_sections)
+                analysis = self._run_pipeline(product_name, product_description, target_countries, governor, sections)
+            else:
+                governor = BudgetGovernor(analysis=metrics)
+                analysis = self._run_agent(product_name, product_description, target_countries, governor)
+        self.last_analysis_metrics = metrics
+        
+        return {
+            "product_name": product_name,
+            "analysis": analysis,
+            "timestamp": datetime.now().isoformat(),
+            "truncated": governor.exceeded is not None,
+            "truncation_reason": governor.exceeded,
+            **({"sections": sections.summary()} if sections else {})
+        }
+    
+    def reanalyze_product(self, product_name: str, product_description: str = "", target_countries: List[str] = None) -> Dict[str, Any]:
+        """Re-check an earlier analysis, recomputing only stale sections.
+        
+        Sections from earlier pipeline runs are reused unless their TTL has
+        expired or the search results they were built from have changed; the
+        result lists which sections were refreshed and which were reused.
+        """
+        return self.analyze_product(product_name, product_description, target_countries, mode="pipeline", reuse_sections=True)
+    
+    def _run_agent(self, product_name: str, product_description: str, target_countries: List[str],
+                   governor: BudgetGovernor) -> str:
+        """Let the agent plan and call tools itself, within the governor's budgets"""
+
         # Create input for agent
         input_data = {
             "input": f"""
@@ -372,40 +632,254 @@ Always provide actionable, data-driven insights with specific recommendations.""
             4. Strategic recommendations
             5. Government incentives
             6. Translated product listings
-            """
+            """,
+            "chat_history": []
         }
         
         # Execute agent
-        result = self.agent_executor.invoke(input_data)
+        try:
+            result = self.agent_executor.invoke(input_data, config={"callbacks": [governor]})
+        except BudgetExceeded:
+            return self._partial_analysis(governor)
         
-        return {
-            "product_name": product_name,
-            "analysis": result["output"],
-            "timestamp": datetime.now().isoformat()
-        }
+        if result["output"] == AGENT_STOPPED_OUTPUT:
+            governor.exceeded = f"step limit of {AGENT_MAX_ITERATIONS} or time budget of {ANALYSIS_MAX_SECONDS:g}s reached"
+            return self._partial_analysis(governor)
+        return result["output"]
     
-    def generate_comprehensive_report(self, analysis_result: Dict[str, Any]) -> str:
-        """Generate a comprehensive market entry report"""
-        
-        prompt = f"""
-        Create a professional, comprehensive market entry report based on this analysis:
-        
-        {json.dumps(analysis_result, indent=2)}
-        
-        Structure the report with:
-        1. Executive Summary
-        2. Market Opportunity Analysis
-        3. Competitive Landscape
-        4. Entry Strategy
-        5. Risk Assessment
-        6. Government Incentives
-        7. Financial Projections
-        8. Implementation Timeline
-        9. Success Metrics
-        10. Next Steps
-        
-        Format as a professional business report suitable for executive presentation.
+    def _partial_analysis(self, governor: BudgetGovernor) -> str:
+        """Best answer available from a run that was stopped early: the tool results it gathered"""
+        print(f"Analysis stopped early: {governor.exceeded} ({governor.stats()})")
+        lines = [f"_Analysis stopped early ({governor.exceeded}); showing the results gathered so far._", ""]
+        for name, output in governor.observations:
+            lines += [f"### {name}", str(output), ""]
+        if not governor.observations:
+            lines.append("No tool results were gathered before the run stopped.")
+        return "\n".join(lines).strip()
+    
+    def _run_tool(self, name: str, governor: BudgetGovernor = None, **kwargs) -> Any:
+        """Call one of the agent's tools directly, without a planning step"""
+        callbacks = [governor] if governor else None
+        return self.tools_by_name[name].invoke(kwargs, config={"callbacks": callbacks})
+    
+    def _pipeline_tasks(self, product_name: str, product_description: str, target_countries: List[str],
+                        governor: BudgetGovernor = None, sections: SectionRefresher = None) -> Dict[Any, tuple]:
+        """The standard workflow as a dependency graph for run_graph.
+        
+        HS code first; per-country market, tariff, competitor and incentive
+        tasks and one batched listing translation run in parallel; recommendations
+        run last on whatever country data succeeded. Tasks that would start
+        after the governor's budget runs out fail with BudgetExceeded. With a
+        SectionRefresher, each task's result goes through the section store.
         """
+        def run(name, **kwargs):
+            return self._run_tool(name, governor, **kwargs)
+        
+        def stored(section, inputs, compute, sources=None, label=None):
+            if sections is None:
+                return compute()
+            return sections.section(section, inputs, compute, sources, label, is_complete=self._section_complete)
+        
+        def hs_code(deps):
+            return stored(
+                "hs_code", [product_name, product_description],
+                lambda: run("get_hs_code", product_name=product_name, description=product_description)
+            )
+        
+        def market(deps, country):
+            code = deps["hs_code"]
+            return stored(
+                "market", [product_name, code, country],
+                lambda: run("analyze_market", product_name=product_name, hs_code=code, countries=[country])[country],
+                lambda fresh: self._market_sources(product_name, code, country, fresh),
+                f"market:{country}"
+            )
+        
+        def tariff(deps, country):
+            code = deps["hs_code"]
+            return stored(
+                "tariff", [code, country],
+                lambda: run("get_tariff_info", hs_code=code, country=country),
+                lambda fresh: self._tariff_source(TARIFF_QUERY.format(hs_code=code, country=country), code, country, fresh),
+                f"tariff:{country}"
+            )
         
-        response = self.llm.invoke(prompt)
-        return response.content 
\ No newline at end of file
+        def competitors(deps, country):
+            return stored(
+                "competitors", [product_name, country],
+                lambda: run("get_competitor_analysis", product_name=product_name, country=country),
+                lambda fresh: self._search(COMPETITOR_QUERY.format(product_name=product_name, country=country), fresh),
+                f"competitors:{country}"
+            )
+        
+        def incentives(deps, country):
+            return stored(
+                "incentives", [country, DEFAULT_PRODUCT_CATEGORY],
+                lambda: run("get_government_incentives", country=country),
+                lambda fresh: [
+                    self._search(INCENTIVES_QUERY.format(product_category=DEFAULT_PRODUCT_CATEGORY, country=country), fresh),
+                    GOVERNMENT_INCENTIVES.get(country, {})
+                ],
+                f"incentives:{country}"
+            )
+        
+        def translation(deps):
+            # Not kept in the section store: the translation cache already holds each language
+            return run("translate_product", product_name=product_name, description=product_description,
+                       target_languages=languages)
+        
+        def recommendations(deps):
+            market_data = self._pipeline_market_data(deps, target_countries)
+            # Keyed on the market data itself, so it's regenerated whenever any section it summarizes changes
+            return stored(
+                "recommendations", [product_name, market_data],
+                lambda: run("generate_recommendations", market_data=market_data, product_name=product_name)
+            )
+        
+        tasks = {"hs_code": (hs_code, [])}
+        for country in target_countries:
+            tasks[("market", country)] = (functools.partial(market, country=country), ["hs_code"])
+            tasks[("tariff", country)] = (functools.partial(tariff, country=country), ["hs_code"])
+            tasks[("competitors", country)] = (functools.partial(competitors, country=country), [])
+            tasks[("incentives", country)] = (functools.partial(incentives, country=country), [])
+        
+        languages = listing_languages(target_countries)
+        if languages:
+            tasks["translation"] = (translation, [])
+        
+        country_tasks = [key for key in tasks if isinstance(key, tuple)]
+        tasks["recommendations"] = (recommendations, ["hs_code"] + country_tasks, True)
+        return tasks
+    
+    def _market_sources(self, product_name: str, hs_code: str, country: str, fresh: bool = False) -> List[Any]:
+        """Source data behind the analyze_market section for one country, searched in parallel"""
+        sources = [
+            lambda: self._search(MARKET_SIZE_QUERY.format(product_name=product_name, country=country), fresh),
+            lambda: self._tariff_source(MARKET_TARIFF_QUERY.format(hs_code=hs_code, country=country), hs_code, country, fresh),
+            lambda: self._search(MARKET_COMPETITOR_QUERY.format(product_name=product_name, country=country), fresh)
+        ]
+        results, errors = run_parallel(dict(enumerate(sources)))
+        return [results[i] if i in results else f"Not available ({errors[i]})" for i in range(len(sources))]
+    
+    def _tariff_source(self, query: str, hs_code: str, country: str, fresh: bool = False) -> Any:
+        """Local tariff table entry if there is one, else the search results for the query"""
+        return get_tariff_store().lookup_record(hs_code, country) or self._search(query, fresh)
+    
+    def _section_complete(self, value: Any) -> bool:
+        """False for results that carry a placeholder for a failed or timed-out lookup"""
+        if isinstance(value, dict):
+            return all(self._section_complete(item) for item in value.values())
+        return not (isinstance(value, str) and value.startswith("Not available"))
+    
+    def _pipeline_market_data(self, results: Dict[Any, Any], target_countries: List[str]) -> Dict[str, Any]:
+        """Per-country findings from the pipeline, without raw search payloads"""
+        market_data = {"hs_code": results.get("hs_code")}
+        for country in target_countries:
+            market = dict(results.get(("market", country)) or {})
+            if ("tariff", country) in results:
+                market["tariff_analysis"] = results[("tariff", country)]["analysis"]
+            if ("competitors", country) in results:
+                market["competitor_analysis"] = results[("competitors", country)]["analysis"]
+            if ("incentives", country) in results:
+                market["incentive_analysis"] = results[("incentives", country)]["incentives"]
+            market_data[country] = market
+        return market_data
+    
+    def _run_pipeline(self, product_name: str, product_description: str, target_countries: List[str],
+                      governor: BudgetGovernor = None, sections: SectionRefresher = None) -> str:
+        """Run the standard workflow as a fixed parallel graph and assemble the analysis"""
+        tasks = self._pipeline_tasks(product_name, product_description, target_countries, governor, sections)
+        # Market tasks outlive analyze_market's deadline, so it can return partial results
+        market_timeout = MARKET_TOOL_DEADLINE_SECONDS + MARKET_TASK_TIMEOUT_MARGIN_SECONDS
+        results, errors = run_graph(tasks, timeouts={
+            key: market_timeout for key in tasks if isinstance(key, tuple) and key[0] == "market"
+        })
+        for key, error in errors.items():
+            print(f"Pipeline task {key!r} failed: {error}")
+        
+        def section(key, render):
+            if key in results:
+                return render(results[key])
+            return f"_Not available: {errors.get(key)}_"
+        
+        lines = [
+            f"## Market Entry Analysis: {product_name}",
+            "",
+            "### HS Code Classification",
+            section("hs_code", lambda hs_code: f"**{hs_code}**"),
+            ""
+        ]
+        
+        for country in target_countries:
+            lines += [
+                f"### {country}",
+                "",
+                "**Market Size**",
+                section(("market", country), lambda market: market["market_size"]),
+                "",
+                "**Tariffs**",
+                section(("tariff", country), lambda tariff: tariff["analysis"]),
+                "",
+                "**Competitors**",
+                section(("competitors", country), lambda competitors: competitors["analysis"]),
+                "",
+                "**Entry Channels**",
+                section(("market", country), lambda market: "\n".join(f"- {channel}" for channel in market["entry_channels"])),
+                "",
+                "**Regulations**",
+                section(("market", country), lambda market: "\n".join(f"- {rule}" for rule in market["regulations"])),
+                "",
+                "**Government Incentives**",
+                section(("incentives", country), lambda incentives: incentives["incentives"]),
+                ""
+            ]
+        
+        lines += [
+            "### Strategic Recommendations",
+            section("recommendations", lambda recommendations: recommendations["recommendations"]),
+            ""
+        ]
+        
+        languages = listing_languages(target_countries)
+        if languages:
+            lines.append("### Translated Product Listings")
+            for language in languages:
+                lines += [
+                    f"**{language}**",
+                    section("translation", lambda translation: self._render_translation(translation, language)),
+                    ""
+                ]
+        
+        return "\n".join(lines).strip()
+    
+    def _render_translation(self, translation: Dict[str, Any], language: str) -> str:
+        """One language of a translate_product result as markdown"""
+        listing = translation["translations"].get(language)
+        if listing is None:
+            return f"_Not available: no {language} translation was returned_"
+        return f"*{listing['translated_name']}*\n\n{listing['translated_description']}"
+    
+    def generate_comprehensive_report(self, analysis_result: Dict[str, Any]) -> str:
+        """Generate a comprehensive market entry report, writing its sections in parallel"""
+        return self.report_engine.generate(analysis_result)
+    
+    def stream_comprehensive_report(self, analysis_result: Dict[str, Any], bypass_cache: bool = None) -> Iterator[tuple]:
+        """Generate the comprehensive report, yielding (section name, text chunk) pairs as they arrive"""
+        yield from self.report_engine.stream(analysis_result, bypass_cache)
+    
+    def regenerate_report_section(self, analysis_result: Dict[str, Any], sections: Dict[str, str], section_name: str) -> Dict[str, str]:
+        """Rewrite one section of a report from report_engine.generate_sections(); returns the updated sections"""
+        return self.report_engine.regenerate_section(analysis_result, sections, section_name)
+    
+    def _stream_llm(self, prompt: str, bypass_cache: bool = None) -> Iterator[str]:
+        """Stream an LLM response through the LLM cache, yielding text chunks"""
+        if bypass_cache is None:
+            bypass_cache = self.bypass_llm_cache
+        
+        yield from get_llm_cache().stream(
+            self.llm.model,
+            self.llm.temperature,
+            prompt,
+            lambda: (chunk.content for chunk in self.llm.stream(prompt)),
+            bypass=bypass_cache
+        )
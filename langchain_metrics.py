@@ -0,0 +1,68 @@
+import threading
+import time
+from langchain_core.callbacks import BaseCallbackHandler
+from instrumentation import current_call_context, record_call, result_size
+from prompt_compaction import estimate_tokens
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """LangChain callback handler recording LLM and tool runs.
+
+    Attach it to the LLM, the search tool and each agent tool rather than to
+    the AgentExecutor, so that calls made inside tools are recorded too and
+    nothing is recorded twice. `name`/`kind` override the recorded labels,
+    e.g. to file the search tool's runs under the same name as raw Tavily calls.
+    """
+
+    # Run inline so the handler sees the caller's call annotations
+    run_inline = True
+
+    def __init__(self, name=None, kind=None, llm_name="gemini"):
+        self.name = name
+        self.kind = kind
+        self.llm_name = llm_name
+        self._runs = {}
+        self._lock = threading.Lock()
+
+    def _start(self, run_id, name, kind, prompt_tokens=0):
+        with self._lock:
+            self._runs[run_id] = (self.name or name, self.kind or kind, time.perf_counter(), current_call_context(), prompt_tokens)
+
+    def _finish(self, run_id, completion_tokens=0, size=0, prompt_tokens=None, error=None):
+        with self._lock:
+            run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+        name, kind, started, context, estimated_prompt_tokens = run
+        record_call(name, kind, time.perf_counter() - started,
+                    estimated_prompt_tokens if prompt_tokens is None else prompt_tokens,
+                    completion_tokens, size, error=error, context=context)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._start(run_id, self.llm_name, "llm", sum(estimate_tokens(prompt) for prompt in prompts))
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        text = "".join(str(message.content) for batch in messages for message in batch)
+        self._start(run_id, self.llm_name, "llm", estimate_tokens(text))
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        text = "".join(generation.text for generations in response.generations for generation in generations)
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        self._finish(
+            run_id,
+            completion_tokens=usage.get("completion_tokens", estimate_tokens(text)),
+            size=len(text),
+            prompt_tokens=usage.get("prompt_tokens")
+        )
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id, error=error)
+
+    def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        self._start(run_id, serialized.get("name", "tool"), "tool")
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._finish(run_id, size=result_size(output))
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id, error=error)
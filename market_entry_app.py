@@ -1,5 +1,6 @@
 import streamlit as st
-from langchain_agent import GlobalMarketEntryAgent
+from agent_pool import get_agent_pool
+from streamlit_utils import analysis_key, memoized_analysis, render_report
 from datetime import datetime
 
 # --- App Config ---
@@ -10,6 +11,9 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Agents are pre-built once per process and reused across sessions
+agent_pool = get_agent_pool()
+
 # --- Sidebar ---
 st.sidebar.title("🌐 Market Entry Analyst (LangChain)")
 st.sidebar.markdown("""
@@ -43,14 +47,31 @@ with st.form("market_entry_form"):
     submitted = st.form_submit_button("🔍 Analyze Market Entry")
 
 # --- Run Analysis ---
+# The latest result stays in session state, so reruns from report, download
+# and widget clicks show it again instead of re-running the analysis
 if submitted and product_name:
-    with st.spinner("Analyzing global market entry opportunities. Please wait..."):
-        agent = GlobalMarketEntryAgent()
-        result = agent.analyze_product(product_name, product_description, target_countries)
-        analysis = result["analysis"]
-        timestamp = result["timestamp"]
+    key = analysis_key("LangChain Market Entry", product_name, product_description, target_countries)
+    state = st.session_state.get("analysis")
+    if state is None or state["key"] != key:
+        def analyze():
+            with agent_pool.acquire() as agent:
+                return agent.analyze_product(product_name, product_description, target_countries)
+
+        with st.spinner("Analyzing global market entry opportunities. Please wait..."):
+            st.session_state["analysis"] = {"key": key, "result": memoized_analysis(key, analyze), "report": None}
+
+elif submitted and not product_name:
+    st.error("Please enter a product name to proceed.")
+
+state = st.session_state.get("analysis")
+if state is not None:
+    result = state["result"]
+    analysis = result["analysis"]
+    timestamp = result["timestamp"]
 
     st.success(f"Analysis complete! (Generated: {datetime.fromisoformat(timestamp).strftime('%Y-%m-%d %H:%M')})")
+    if result.get("truncated"):
+        st.warning(f"The analysis was cut short ({result['truncation_reason']}); some sections may be missing.")
 
     # --- Results Display ---
     st.header("📊 Market Insights & Recommendations")
@@ -58,18 +79,21 @@ if submitted and product_name:
 
     # --- Downloadable Report ---
     if st.button("📄 Generate & Download Full Report"):
-        with st.spinner("Generating comprehensive report..."):
-            report = agent.generate_comprehensive_report(result)
+        st.header("📄 Market Entry Report")
+        with agent_pool.acquire() as agent:
+            state["report"] = render_report(agent.stream_comprehensive_report(result), agent.report_engine)
+    elif state["report"] is not None:
+        st.header("📄 Market Entry Report")
+        st.markdown(state["report"])
+
+    if state["report"] is not None:
         st.download_button(
             label="Download Market Entry Report (PDF)",
-            data=report,
-            file_name=f"market_entry_report_{product_name.replace(' ', '_')}.txt",
+            data=state["report"],
+            file_name=f"market_entry_report_{result['product_name'].replace(' ', '_')}.txt",
             mime="text/plain"
         )
 
-elif submitted and not product_name:
-    st.error("Please enter a product name to proceed.")
-
 # --- Footer ---
 st.markdown("""
 ---
@@ -0,0 +1,117 @@
+import re
+import numpy as np
+import pandas as pd
+from config import GOVERNMENT_INCENTIVES, MARKET_SCORE_WEIGHTS
+
+FEATURES = ["tariff_rate", "market_size", "competitor_density", "incentive_count", "regulatory_burden"]
+
+# +1 when a higher value makes a market more attractive, -1 when lower is better
+FEATURE_DIRECTIONS = np.array([-1, 1, -1, 1, -1])
+
+SIZE_MULTIPLIERS = {
+    "trillion": 1e12, "tn": 1e12,
+    "billion": 1e9, "bn": 1e9, "b": 1e9,
+    "million": 1e6, "mn": 1e6, "m": 1e6,
+    "thousand": 1e3, "k": 1e3
+}
+
+
+def parse_market_size(value):
+    """Largest monetary amount mentioned in a market size summary, in units; NaN if none"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    amounts = [
+        float(number.replace(",", "")) * SIZE_MULTIPLIERS[unit.lower()]
+        for number, unit in re.findall(
+            r"(\d[\d,]*(?:\.\d+)?)\s*(trillion|billion|million|thousand|tn|bn|mn|b|m|k)\b",
+            str(value),
+            re.IGNORECASE
+        )
+    ]
+    return max(amounts) if amounts else np.nan
+
+
+def count_competitors(value):
+    """Number of competitors named in a list or a bulleted/numbered summary"""
+    if isinstance(value, (list, tuple)):
+        return len(value)
+    lines = [line.strip() for line in str(value).splitlines() if line.strip()]
+    listed = [line for line in lines if re.match(r"^([-*•]|\d+[.)])\s+", line)]
+    return len(listed) if listed else np.nan
+
+
+def market_data_features(market_data, product="product"):
+    """Feature rows for one product's market analysis, indexed by (product, country)"""
+    rows = []
+    for country, data in market_data.items():
+        rows.append({
+            "product": product,
+            "country": country,
+            "tariff_rate": float(data.get("tariff_rate", np.nan)),
+            "market_size": parse_market_size(data.get("market_size", "")),
+            "competitor_density": count_competitors(data.get("competitors", "")),
+            "incentive_count": len(data.get("incentives") or GOVERNMENT_INCENTIVES.get(country, {})),
+            "regulatory_burden": len(data.get("regulations", []))
+        })
+    return pd.DataFrame(rows, columns=["product", "country"] + FEATURES).set_index(["product", "country"])
+
+
+def resolve_weights(weights=None):
+    """Merge user weights over MARKET_SCORE_WEIGHTS and return them in FEATURES order"""
+    merged = dict(MARKET_SCORE_WEIGHTS)
+    for name, weight in (weights or {}).items():
+        if name not in merged:
+            raise ValueError(f"Unknown scoring feature: {name}")
+        merged[name] = weight
+
+    vector = np.array([merged[name] for name in FEATURES], dtype=float)
+    if (vector < 0).any() or vector.sum() == 0:
+        raise ValueError("Scoring weights must be non-negative and not all zero")
+    return vector / vector.sum()
+
+
+def score_feature_cube(cube, weights=None):
+    """Score a (products, countries, features) array in one vectorized pass.
+
+    Each feature is log-scaled where it spans orders of magnitude, min-max
+    normalized over the whole batch, flipped so that higher is always better,
+    and combined with the weights. Missing values score as neutral (0.5).
+    Returns a (products, countries) array of scores in [0, 100].
+    """
+    cube = np.asarray(cube, dtype=float).copy()
+    size = FEATURES.index("market_size")
+    cube[..., size] = np.log1p(cube[..., size])
+
+    # Missing values are left out of each feature's range; a feature missing
+    # everywhere gets an empty range (inf, -inf) and so scores as neutral
+    missing = np.isnan(cube)
+    lows = np.where(missing, np.inf, cube).min(axis=(0, 1), initial=np.inf)
+    highs = np.where(missing, -np.inf, cube).max(axis=(0, 1), initial=-np.inf)
+    spans = np.where(highs > lows, highs - lows, 1.0)
+    normalized = np.where(highs > lows, (cube - lows) / spans, 0.5)
+    normalized = np.where(FEATURE_DIRECTIONS > 0, normalized, 1 - normalized)
+    normalized = np.nan_to_num(normalized, nan=0.5)
+
+    return normalized @ resolve_weights(weights) * 100
+
+
+def score_markets(features, weights=None):
+    """Score a (product, country)-indexed feature frame; returns a products x countries frame"""
+    products = features.index.get_level_values("product").unique()
+    countries = features.index.get_level_values("country").unique()
+    full_index = pd.MultiIndex.from_product([products, countries], names=["product", "country"])
+
+    cube = features.reindex(full_index)[FEATURES].to_numpy().reshape(len(products), len(countries), len(FEATURES))
+    scores = pd.DataFrame(score_feature_cube(cube, weights), index=products, columns=countries)
+
+    # Pairs that weren't in the input stay unscored
+    present = full_index.isin(features.index).reshape(len(products), len(countries))
+    return scores.where(present)
+
+
+def rank_markets(features, weights=None):
+    """Full per-product rankings as a long frame: product, country, score, rank"""
+    scores = score_markets(features, weights)
+    ranked = scores.stack().dropna().rename("score").reset_index()
+    ranked["rank"] = ranked.groupby("product")["score"].rank(ascending=False, method="min").astype(int)
+    return ranked.sort_values(["product", "rank"]).reset_index(drop=True)
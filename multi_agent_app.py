@@ -1,19 +1,12 @@
 import streamlit as st
-from market_research_agent import MarketResearchAgent
-from competitive_intelligence_agent import CompetitiveIntelligenceAgent
-from cultural_intelligence_agent import CulturalIntelligenceAgent
-from financial_analysis_agent import FinancialAnalysisAgent
-from regulatory_compliance_agent import RegulatoryComplianceAgent
-from strategy_recommendation_agent import StrategyRecommendationAgent
-
-AGENT_CLASSES = {
-    "Market Research": MarketResearchAgent,
-    "Competitive Intelligence": CompetitiveIntelligenceAgent,
-    "Cultural Intelligence": CulturalIntelligenceAgent,
-    "Financial Analysis": FinancialAnalysisAgent,
-    "Regulatory Compliance": RegulatoryComplianceAgent,
-    "Strategy Recommendation": StrategyRecommendationAgent,
-}
+from config import MULTI_AGENT_MAX_CONCURRENCY, MULTI_AGENT_TIMEOUT_SECONDS
+from task_runner import iter_parallel
+from search_aggregator import aggregate_searches
+from streamlit_utils import analysis_key, cached_analysis, memoized_analysis, with_script_context
+from agent_registry import MULTI_AGENT_NAMES, get_agent_registry
+
+# Agent modules, and the SDKs behind them, are imported when an agent is first used
+agent_registry = get_agent_registry()
 
 st.set_page_config(
     page_title="Multi-Agent Market Entry Analyst",
@@ -27,10 +20,15 @@ st.sidebar.markdown("""
 Select an agent, enter your product details, and analyze global opportunities from different perspectives!
 """)
 
-agent_name = st.sidebar.selectbox("Choose Analysis Agent", list(AGENT_CLASSES.keys()))
-AgentClass = AGENT_CLASSES[agent_name]
+run_all = st.sidebar.radio("Mode", ["Single agent", "Run all agents"]) == "Run all agents"
+if run_all:
+    agent_names = st.sidebar.multiselect("Agents to run", MULTI_AGENT_NAMES, default=MULTI_AGENT_NAMES)
+    title = "All Agents"
+else:
+    agent_names = [st.sidebar.selectbox("Choose Analysis Agent", MULTI_AGENT_NAMES)]
+    title = agent_names[0]
 
-st.title(f"{agent_name} - AI Market Entry Analyst")
+st.title(f"{title} - AI Market Entry Analyst")
 
 with st.form("multi_agent_form"):
     col1, col2 = st.columns([1, 2])
@@ -43,18 +41,87 @@ with st.form("multi_agent_form"):
             ["Germany", "UAE", "Canada", "India", "UK", "Australia", "Netherlands", "Sweden", "Norway", "Denmark"],
             default=["Germany", "UAE", "Canada"]
         )
-    submitted = st.form_submit_button(f"🔍 Analyze with {agent_name}")
+    submitted = st.form_submit_button(f"🔍 Analyze with {title}")
+
+
+def run_agents(names):
+    """Run the named agents concurrently on the form input, rendering each
+    agent's panel as soon as it finishes; returns {agent name: markdown}"""
+    keys = {name: analysis_key(name, product_name, product_description, target_countries) for name in names}
+    # Memoized agents are shown straight away and need no warm-up or searches
+    results = {name: cached_analysis(keys[name]) for name in names}
+    results = {name: result for name, result in results.items() if result is not None}
+    pending = [name for name in names if name not in results]
+
+    panels = {}
+    for name in names:
+        st.header(name)
+        panels[name] = st.empty()
+        if name in results:
+            panels[name].markdown(results[name])
+    if not pending:
+        return results
+
+    # Agents are built here, on the script thread, since they may prompt for API keys;
+    # they all use the process-wide pooled search client
+    agents = {name: agent_registry.create(name) for name in pending}
+    agents[pending[0]].warm_up()
+    if len(agents) > 1:
+        with st.spinner("Running merged searches for all agents..."):
+            aggregator = aggregate_searches(agents.values(), product_name, product_description, target_countries)
+        st.caption(f"{len(aggregator.queries)} agent queries answered by {aggregator.searches} merged searches")
+    for name in pending:
+        panels[name].info(f"{name} is analyzing your product...")
 
-if submitted and product_name:
-    with st.spinner(f"{agent_name} is analyzing your product..."):
-        agent = AgentClass()
-        result = agent.analyze(product_name, product_description, target_countries)
+    tasks = {
+        name: with_script_context(lambda name=name, agent=agent: memoized_analysis(
+            keys[name], lambda: agent.analyze(product_name, product_description, target_countries)
+        ))
+        for name, agent in agents.items()
+    }
+    for name, result, error in iter_parallel(tasks, MULTI_AGENT_MAX_CONCURRENCY, MULTI_AGENT_TIMEOUT_SECONDS):
+        if error is None:
+            results[name] = result
+            panels[name].markdown(result)
+        else:
+            panels[name].error(f"{name} failed: {error}")
+    return results
+
+
+# The latest results stay in session state, so widget changes show them
+# again instead of re-running the agents
+if submitted and product_name and run_all and not agent_names:
+    st.error("Please choose at least one agent to run.")
+elif submitted and product_name and run_all:
+    st.session_state["agent_results"] = run_agents(agent_names)
+    st.session_state["agent_results_shown"] = True
     st.success("Analysis complete!")
-    st.header("Result")
-    st.markdown(result)
+elif submitted and product_name:
+    agent_name = agent_names[0]
+    key = analysis_key(agent_name, product_name, product_description, target_countries)
+    result = cached_analysis(key)
+    if result is None:
+        with st.spinner(f"{agent_name} is analyzing your product..."):
+            agent = agent_registry.create(agent_name)
+            result = memoized_analysis(key, lambda: agent.analyze(product_name, product_description, target_countries))
+    st.session_state["agent_results"] = {agent_name: result}
+    st.session_state["agent_results_shown"] = False
 elif submitted and not product_name:
     st.error("Please enter a product name to proceed.")
 
+agent_results = st.session_state.get("agent_results")
+if agent_results and not st.session_state.pop("agent_results_shown", False):
+    st.success("Analysis complete!")
+    for name, result in agent_results.items():
+        st.header(name if len(agent_results) > 1 else "Result")
+        st.markdown(result)
+
+import_times = agent_registry.import_times()
+if import_times:
+    with st.sidebar.expander("Agent load times"):
+        for name, seconds in import_times.items():
+            st.write(f"{name}: {seconds:.2f}s")
+
 st.markdown("""
 ---
 :rocket: _Demo MVP. For feedback or custom solutions, contact us!_
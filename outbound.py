@@ -0,0 +1,251 @@
+import asyncio
+import random
+import threading
+import time
+from concurrent.futures import Future
+from instrumentation import call_context
+from config import OUTBOUND_RATE_LIMITS, OUTBOUND_MAX_RETRIES, OUTBOUND_BACKOFF_BASE, OUTBOUND_BACKOFF_MAX
+
+THROTTLING_STATUS_CODES = {429, 503}
+THROTTLING_MARKERS = ["429", "rate limit", "ratelimit", "too many requests", "quota", "resource exhausted", "resourceexhausted", "503", "service unavailable"]
+
+
+def is_throttling_error(error):
+    """True for provider errors that mean "slow down" rather than "this request is bad" """
+    for source in (error, getattr(error, "response", None)):
+        for attr in ("status_code", "code", "status"):
+            if getattr(source, attr, None) in THROTTLING_STATUS_CODES:
+                return True
+    text = f"{type(error).__name__} {error}".lower()
+    return any(marker in text for marker in THROTTLING_MARKERS)
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, bursts up to `capacity`"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available; returns the seconds spent waiting"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    async def acquire_async(self):
+        """acquire() for coroutines: waits without blocking the event loop"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+            await asyncio.sleep(delay)
+            waited += delay
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one execution"""
+
+    def __init__(self):
+        self.coalesced = 0
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    async def ado(self, key, coro_fn):
+        """do() for coroutines. Calls are shared with do() and across event loops,
+        so the same search from a sync path, another session's loop or this one
+        runs once."""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            # Shielded so a follower timing out doesn't cancel the shared call
+            return await asyncio.shield(asyncio.wrap_future(future))
+
+        try:
+            result = await coro_fn()
+        except asyncio.CancelledError:
+            future.set_exception(RuntimeError("Coalesced call was cancelled by its caller"))
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+
+class Provider:
+    """Outbound policy for one API provider: rate limit, retries with backoff, coalescing"""
+
+    def __init__(self, name, rate, burst, max_retries=OUTBOUND_MAX_RETRIES,
+                 backoff_base=OUTBOUND_BACKOFF_BASE, backoff_max=OUTBOUND_BACKOFF_MAX):
+        self.name = name
+        self.bucket = TokenBucket(rate, burst)
+        self.single_flight = SingleFlight()
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.calls = 0
+        self.retries = 0
+        self.throttled = 0
+        self.rate_limit_wait = 0.0
+
+    def backoff_delay(self, attempt):
+        """Exponential backoff with jitter: half fixed, half random"""
+        delay = min(self.backoff_max, self.backoff_base * 2 ** attempt)
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def call(self, fn, key=None):
+        """Run fn() under this provider's policy; identical keys in flight share one call"""
+        if key is None:
+            return self._call_with_retries(fn)
+        return self.single_flight.do(key, lambda: self._call_with_retries(fn))
+
+    def _call_with_retries(self, fn):
+        queue_wait = 0.0
+        for attempt in range(self.max_retries + 1):
+            waited = self.bucket.acquire()
+            self.rate_limit_wait += waited
+            queue_wait += waited
+            self.calls += 1
+            try:
+                with call_context(queue_wait=queue_wait):
+                    return fn()
+            except Exception as e:
+                if not is_throttling_error(e) or attempt == self.max_retries:
+                    raise
+                self.throttled += 1
+                self.retries += 1
+                delay = self.backoff_delay(attempt)
+                print(f"{self.name} throttled ({e}); retrying in {delay:.1f}s")
+                time.sleep(delay)
+                queue_wait += delay
+
+    async def acall(self, coro_fn, key=None):
+        """Await coro_fn() under this provider's policy; identical keys in flight share one call"""
+        if key is None:
+            return await self._acall_with_retries(coro_fn)
+        return await self.single_flight.ado(key, lambda: self._acall_with_retries(coro_fn))
+
+    async def _acall_with_retries(self, coro_fn):
+        queue_wait = 0.0
+        for attempt in range(self.max_retries + 1):
+            waited = await self.bucket.acquire_async()
+            self.rate_limit_wait += waited
+            queue_wait += waited
+            self.calls += 1
+            try:
+                with call_context(queue_wait=queue_wait):
+                    return await coro_fn()
+            except Exception as e:
+                if not is_throttling_error(e) or attempt == self.max_retries:
+                    raise
+                self.throttled += 1
+                self.retries += 1
+                delay = self.backoff_delay(attempt)
+                print(f"{self.name} throttled ({e}); retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                queue_wait += delay
+
+    def stats(self):
+        return {
+            "calls": self.calls,
+            "retries": self.retries,
+            "throttled": self.throttled,
+            "coalesced": self.single_flight.coalesced,
+            "rate_limit_wait": round(self.rate_limit_wait, 3)
+        }
+
+
+_providers = {}
+_providers_lock = threading.Lock()
+
+
+def get_provider(name):
+    """Process-wide Provider, configured from OUTBOUND_RATE_LIMITS"""
+    with _providers_lock:
+        if name not in _providers:
+            rate, burst = OUTBOUND_RATE_LIMITS.get(name, OUTBOUND_RATE_LIMITS["default"])
+            _providers[name] = Provider(name, rate, burst)
+        return _providers[name]
+
+
+def call_provider(name, fn, key=None):
+    """Run fn() through the named provider's rate limiter, retry policy and coalescing"""
+    return get_provider(name).call(fn, key=key)
+
+
+async def acall_provider(name, coro_fn, key=None):
+    """Await coro_fn() through the named provider's rate limiter, retry policy and coalescing"""
+    return await get_provider(name).acall(coro_fn, key=key)
+
+
+_END = object()
+
+
+def stream_provider(name, stream_fn):
+    """Yield chunks from a streaming call opened under the named provider's policy.
+
+    Opening the stream and receiving the first chunk are rate limited and
+    retried like any other call; an error after that propagates to the caller.
+    """
+    def open_stream():
+        iterator = iter(stream_fn())
+        return iterator, next(iterator, _END)
+
+    iterator, first = call_provider(name, open_stream)
+    if first is _END:
+        return
+    yield first
+    yield from iterator
@@ -0,0 +1,119 @@
+import re
+import threading
+from config import PROMPT_TOKEN_BUDGET
+
+BOILERPLATE_PATTERNS = re.compile(
+    r"cookie|subscribe|sign up|sign in|log in|newsletter|all rights reserved|privacy policy|"
+    r"terms of (use|service)|click here|read more|share this|advertisement|javascript|"
+    r"skip to (main )?content|accept all|download (the )?(full )?report|request (a )?sample",
+    re.IGNORECASE
+)
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "for", "with", "of", "in", "on", "to", "from", "by",
+    "is", "are", "what", "this", "that", "based", "provide", "insights", "2024"
+}
+MIN_SENTENCE_CHARS = 25
+
+
+def estimate_tokens(text):
+    """Rough token count (about four characters per token for English text)"""
+    return max(1, len(text) // 4) if text else 0
+
+
+def _terms(text):
+    return {t for t in re.findall(r"[a-z0-9]+", text.lower()) if t not in STOPWORDS and len(t) > 1}
+
+
+def _sentences(text):
+    return [s.strip() for s in re.split(r"(?<=[.!?])\s+|\n+", text) if s.strip()]
+
+
+def _result_items(results):
+    """Normalize a Tavily response, result list or error string into a list of dicts"""
+    if isinstance(results, dict):
+        results = results.get("results", [])
+    if isinstance(results, str):
+        return [{"title": "", "content": results}]
+    return [item if isinstance(item, dict) else {"content": str(item)} for item in results or []]
+
+
+class CompactionStats:
+    """Running totals of prompt tokens before and after compaction"""
+
+    def __init__(self):
+        self.payloads = 0
+        self.tokens_before = 0
+        self.tokens_after = 0
+        self._lock = threading.Lock()
+
+    def record(self, before, after):
+        with self._lock:
+            self.payloads += 1
+            self.tokens_before += before
+            self.tokens_after += after
+
+    def as_dict(self):
+        return {
+            "payloads": self.payloads,
+            "tokens_before": self.tokens_before,
+            "tokens_after": self.tokens_after,
+            "tokens_saved": self.tokens_before - self.tokens_after
+        }
+
+
+compaction_stats = CompactionStats()
+
+
+def compact_results(results, context, token_budget=None):
+    """Compact search results for a prompt about `context`.
+
+    Drops URLs, scores and raw content, strips boilerplate and sentences
+    repeated across results, then keeps the sentences most relevant to the
+    context (and those carrying figures) until the token budget is spent.
+    Returns (text, {"tokens_before", "tokens_after", "tokens_saved"}).
+    """
+    token_budget = token_budget or PROMPT_TOKEN_BUDGET
+    items = _result_items(results)
+    before = estimate_tokens(str(results))
+    context_terms = _terms(context)
+
+    seen = set()
+    candidates = []  # (score, -result index, -sentence index, sentence)
+    for i, item in enumerate(items):
+        for j, sentence in enumerate(_sentences(str(item.get("content", "")))):
+            key = re.sub(r"\W+", " ", sentence.lower()).strip()
+            if len(sentence) < MIN_SENTENCE_CHARS or key in seen or BOILERPLATE_PATTERNS.search(sentence):
+                continue
+            seen.add(key)
+            score = len(context_terms & _terms(sentence))
+            if re.search(r"\d", sentence):
+                score += 1
+            # Earlier results and sentences break ties; search ranking already ordered them
+            candidates.append((score, -i, -j, sentence))
+
+    selected = {}
+    used = 0
+    for score, neg_i, neg_j, sentence in sorted(candidates, reverse=True):
+        cost = estimate_tokens(sentence)
+        if -neg_i not in selected:
+            cost += estimate_tokens(str(items[-neg_i].get("title", ""))) + 2
+        if used + cost > token_budget:
+            continue
+        selected.setdefault(-neg_i, []).append((-neg_j, sentence))
+        used += cost
+
+    lines = []
+    for i in sorted(selected):
+        title = str(items[i].get("title", "")).strip()
+        body = " ".join(sentence for _, sentence in sorted(selected[i]))
+        lines.append(f"[{len(lines) + 1}] {title + ': ' if title else ''}{body}")
+
+    text = "\n".join(lines) if lines else "No relevant search results."
+    after = estimate_tokens(text)
+    compaction_stats.record(before, after)
+    return text, {"tokens_before": before, "tokens_after": after, "tokens_saved": max(0, before - after)}
+
+
+def compact(results, context, token_budget=None):
+    """Compacted search results text for interpolating into a prompt"""
+    return compact_results(results, context, token_budget)[0]
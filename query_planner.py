@@ -0,0 +1,90 @@
+import re
+from task_runner import run_parallel
+
+# field -> (query template, max_results)
+# The tariff query doesn't mention the product, so products sharing an HS
+# code collapse onto one search.
+QUERY_TEMPLATES = {
+    "tariff_rate": ("tariff rate HS code {hs_code} {country} 2024 import duty", 5),
+    "market_size": ("market size {product} sustainable eco-friendly {country} 2024", 3),
+    "competitors": ("competitors {product} sustainable {country} Amazon marketplace", 5),
+}
+
+
+def query_key(query):
+    """Order-, case- and repetition-insensitive key, so near-duplicate phrasings collapse"""
+    return " ".join(sorted(set(re.findall(r"[a-z0-9.]+", query.lower()))))
+
+
+class SearchTask:
+    def __init__(self, query, max_results):
+        self.query = query
+        self.max_results = max_results
+        self.consumers = []
+
+
+class QueryPlan:
+    """Deduplicated set of searches and the consumers each one feeds.
+
+    A consumer is any hashable key, typically (product, country, field).
+    """
+
+    def __init__(self, templates=None):
+        self.templates = templates or QUERY_TEMPLATES
+        self.tasks = {}
+
+    def add(self, consumer, field, product=None, country=None, hs_code=None):
+        """Register a consumer for the search backing `field`; returns the shared task"""
+        template, max_results = self.templates[field]
+        query = template.format(product=product, country=country, hs_code=hs_code)
+        return self.add_query(consumer, query, max_results)
+
+    def add_query(self, consumer, query, max_results=5):
+        """Register a consumer for an arbitrary query"""
+        key = query_key(query)
+        task = self.tasks.get(key)
+        if task is None:
+            task = self.tasks[key] = SearchTask(query, max_results)
+        else:
+            # Shared searches fetch enough results for their hungriest consumer
+            task.max_results = max(task.max_results, max_results)
+        task.consumers.append(consumer)
+        return task
+
+    def execute(self, search_fn, max_workers=None):
+        """Run every search as one batch and route results back.
+
+        search_fn(query, max_results) returns a result list. Returns
+        (results, errors), both keyed by consumer.
+        """
+        tasks = {
+            key: (lambda task=task: search_fn(task.query, task.max_results))
+            for key, task in self.tasks.items()
+        }
+        fetched, failed = run_parallel(tasks, max_workers=max_workers)
+
+        results, errors = {}, {}
+        for key, task in self.tasks.items():
+            for consumer in task.consumers:
+                if key in fetched:
+                    results[consumer] = fetched[key]
+                else:
+                    errors[consumer] = failed[key]
+        return results, errors
+
+
+def plan_market_searches(products, countries, fields, hs_codes=None, skip=()):
+    """Plan searches for products x countries x fields.
+
+    hs_codes maps product -> HS code for tariff searches. Consumers are
+    (product, country, field); any listed in skip are left out.
+    """
+    hs_codes = hs_codes or {}
+    plan = QueryPlan()
+    for product in products:
+        for country in countries:
+            for field in fields:
+                consumer = (product, country, field)
+                if consumer not in skip:
+                    plan.add(consumer, field, product=product, country=country, hs_code=hs_codes.get(product))
+    return plan
@@ -1,5 +1,4 @@
 from base_agent import BaseAgent
-from tavily import TavilyClient
 
 class RegulatoryComplianceAgent(BaseAgent):
     def __init__(self):
@@ -8,12 +7,5 @@ class RegulatoryComplianceAgent(BaseAgent):
             {"name": "TAVILY_API_KEY", "label": "Tavily API Key"}
         ])
 
-    def analyze(self, product_name, product_description, target_countries):
-        tavily = TavilyClient(api_key=self.get_api_key("TAVILY_API_KEY"))
-        results = []
-        for country in target_countries:
-            query = f"import regulations, certifications, and compliance requirements for {product_name} in {country} 2024"
-            search = tavily.search(query=query, max_results=2)
-            summary = search['results'][0]['content'] if search['results'] else 'No data found.'
-            results.append(f"**{country}**: {summary}")
-        return "\n\n".join(results) 
\ No newline at end of file
+    def country_query(self, product_name, product_description, country):
+        return f"import regulations, certifications, and compliance requirements for {product_name} in {country} 2024" 
\ No newline at end of file
@@ -0,0 +1,255 @@
+import contextvars
+import json
+import queue
+import threading
+from config import REPORT_SECTION_TOKEN_BUDGET, REPORT_SUMMARY_TOKENS_PER_SECTION
+from prompt_compaction import compact
+from task_runner import run_parallel
+
+
+class ReportSection:
+    """One section of a report and the slice of analysis data it is written from.
+
+    fields: per-country market fields (and "recommendations") the section
+    needs from a structured analysis. focus: terms used to pick the relevant
+    sentences out of a free-text analysis.
+    """
+
+    def __init__(self, name, title, instructions, fields=(), focus=""):
+        self.name = name
+        self.title = title
+        self.instructions = instructions
+        self.fields = list(fields)
+        self.focus = focus
+
+
+EXECUTIVE_SUMMARY = ReportSection(
+    "executive_summary", "Executive Summary",
+    "Summarize the opportunity, the recommended first market and entry route, the main risks and the immediate next steps."
+)
+
+MARKET_OPPORTUNITY = ReportSection(
+    "market_opportunity", "Market Opportunity Analysis",
+    "Compare market size, growth and demand across the target countries and identify the strongest opportunity.",
+    ["market_size"], "market size growth demand opportunity trend HS code"
+)
+COMPETITIVE_LANDSCAPE = ReportSection(
+    "competitive_landscape", "Competitive Landscape",
+    "Describe the main competitors, their pricing and positioning, and where there is room to differentiate.",
+    ["competitors"], "competitors brands prices pricing market share positioning"
+)
+ENTRY_STRATEGY = ReportSection(
+    "entry_strategy", "Entry Strategy",
+    "Recommend the entry channels, partners and positioning for each market, in order of priority.",
+    ["entry_channels", "recommendations"], "entry strategy channels distributors partnerships marketplace pricing positioning"
+)
+RISK_ASSESSMENT = ReportSection(
+    "risk_assessment", "Risk Assessment",
+    "Assess regulatory, tariff and market risks and how to mitigate each.",
+    ["regulations", "tariff_rate"], "risk regulations compliance certification tariff duty import"
+)
+GOVERNMENT_INCENTIVES_SECTION = ReportSection(
+    "government_incentives", "Government Incentives",
+    "List the incentive programs worth applying for and what each offers.",
+    ["incentives"], "government incentives programs funding grants export support"
+)
+FINANCIAL_PROJECTIONS = ReportSection(
+    "financial_projections", "Financial Projections",
+    "Estimate revenue potential, landed cost effects of tariffs and price positioning; state assumptions.",
+    ["market_size", "tariff_rate", "competitors"], "market size revenue price pricing cost margin tariff duty budget"
+)
+IMPLEMENTATION_TIMELINE = ReportSection(
+    "implementation_timeline", "Implementation Timeline",
+    "Lay out a phased timeline covering compliance, partnerships and launch.",
+    ["entry_channels", "regulations", "recommendations"], "timeline phase launch certification partnership months"
+)
+SUCCESS_METRICS = ReportSection(
+    "success_metrics", "Success Metrics",
+    "Define the KPIs and targets that show whether the entry is working.",
+    ["market_size", "competitors", "recommendations"], "KPI metrics targets market share sales growth"
+)
+NEXT_STEPS = ReportSection(
+    "next_steps", "Next Steps",
+    "List the concrete actions to take first, in order.",
+    ["recommendations"], "recommendations next steps actions priorities"
+)
+
+# The 10-section report of the LangChain agent and the 1-page report of the Gemini agent
+COMPREHENSIVE_REPORT_SECTIONS = [
+    EXECUTIVE_SUMMARY, MARKET_OPPORTUNITY, COMPETITIVE_LANDSCAPE, ENTRY_STRATEGY, RISK_ASSESSMENT,
+    GOVERNMENT_INCENTIVES_SECTION, FINANCIAL_PROJECTIONS, IMPLEMENTATION_TIMELINE, SUCCESS_METRICS, NEXT_STEPS
+]
+ONE_PAGE_REPORT_SECTIONS = [
+    EXECUTIVE_SUMMARY, MARKET_OPPORTUNITY, COMPETITIVE_LANDSCAPE, ENTRY_STRATEGY, RISK_ASSESSMENT,
+    GOVERNMENT_INCENTIVES_SECTION, NEXT_STEPS
+]
+
+_DONE = object()
+
+
+def section_data(analysis_result, section):
+    """The part of an analysis result a section needs.
+
+    Structured results (with "market_analysis") are cut down to the
+    section's fields; free-text results (with "analysis") are compacted to
+    the sentences relevant to the section.
+    """
+    if "market_analysis" in analysis_result:
+        markets = {
+            country: {field: data[field] for field in section.fields if field in data}
+            for country, data in analysis_result["market_analysis"].items()
+        }
+        data = {
+            "product_name": analysis_result.get("product_name"),
+            "hs_code": analysis_result.get("hs_code"),
+            "markets": markets
+        }
+        if "recommendations" in section.fields:
+            data["recommendations"] = analysis_result.get("recommendations")
+        return json.dumps(data, indent=2, default=str)
+
+    return compact(str(analysis_result.get("analysis", "")), f"{section.title} {section.focus}", REPORT_SECTION_TOKEN_BUDGET)
+
+
+class ReportEngine:
+    """Map-reduce report writer.
+
+    Every section except the executive summary is written in parallel from
+    its own slice of the analysis; a short final pass then writes the
+    executive summary from the finished sections. generate_fn(prompt,
+    bypass_cache) returns text and stream_fn(prompt, bypass_cache) yields
+    text chunks; both are expected to go through the LLM cache.
+    """
+
+    def __init__(self, sections, generate_fn, stream_fn, title="Market Entry Report",
+                 length="a focused section of two or three short paragraphs or a bullet list",
+                 summary_section=EXECUTIVE_SUMMARY):
+        self.sections = sections
+        self.generate_fn = generate_fn
+        self.stream_fn = stream_fn
+        self.title = title
+        self.length = length
+        self.summary_section = summary_section
+        self.body = [section for section in sections if section is not summary_section]
+
+    def section(self, name):
+        for section in self.sections:
+            if section.name == name:
+                return section
+        raise KeyError(f"Unknown report section: {name!r}")
+
+    def heading(self, section):
+        return f"## {self.sections.index(section) + 1}. {section.title}"
+
+    def section_prompt(self, section, analysis_result):
+        return f"""
+        You are writing the "{section.title}" section of a professional market entry report
+        for {analysis_result.get("product_name", "a product")}, for an executive audience.
+
+        {section.instructions}
+
+        Base it only on this data:
+        {section_data(analysis_result, section)}
+
+        Write {self.length}. Do not repeat the section title.
+        """
+
+    def summary_prompt(self, texts, analysis_result):
+        summaries = "\n\n".join(
+            f"{section.title}:\n{compact(texts.get(section.name, ''), section.title, REPORT_SUMMARY_TOKENS_PER_SECTION)}"
+            for section in self.body
+        )
+        return f"""
+        You are writing the "{self.summary_section.title}" of a market entry report
+        for {analysis_result.get("product_name", "a product")}. The other sections say:
+
+        {summaries}
+
+        {self.summary_section.instructions}
+        Write one short paragraph followed by at most five bullet points. Do not repeat the section title.
+        """
+
+    def _unavailable(self, section, error):
+        print(f"Error writing report section {section.name}: {error}")
+        return f"_This section could not be generated ({error})._"
+
+    def generate_sections(self, analysis_result, bypass_cache=None):
+        """Write every section; returns {section name: text} in report order"""
+        tasks = {
+            section.name: (lambda section=section: self.generate_fn(self.section_prompt(section, analysis_result), bypass_cache))
+            for section in self.body
+        }
+        results, errors = run_parallel(tasks)
+        texts = {
+            section.name: results[section.name] if section.name in results else self._unavailable(section, errors[section.name])
+            for section in self.body
+        }
+        texts[self.summary_section.name] = self.generate_fn(self.summary_prompt(texts, analysis_result), bypass_cache)
+        return {section.name: texts[section.name] for section in self.sections}
+
+    def regenerate_section(self, analysis_result, texts, name):
+        """Rewrite one section, bypassing the LLM cache, and refresh the executive
+        summary to match; returns the updated {section name: text}"""
+        texts = dict(texts)
+        section = self.section(name)
+        if section is not self.summary_section:
+            texts[name] = self.generate_fn(self.section_prompt(section, analysis_result), True)
+        texts[self.summary_section.name] = self.generate_fn(
+            self.summary_prompt(texts, analysis_result), section is self.summary_section
+        )
+        return {section.name: texts[section.name] for section in self.sections}
+
+    def assemble(self, texts):
+        """The full report as markdown, sections in report order"""
+        parts = [f"# {self.title}"]
+        for section in self.sections:
+            parts.append(f"{self.heading(section)}\n\n{texts.get(section.name, '').strip()}")
+        return "\n\n".join(parts) + "\n"
+
+    def generate(self, analysis_result, bypass_cache=None):
+        return self.assemble(self.generate_sections(analysis_result, bypass_cache))
+
+    def stream(self, analysis_result, bypass_cache=None):
+        """Yield (section name, text chunk) pairs as the report is written.
+
+        Body sections stream in parallel, so their chunks interleave; the
+        executive summary streams last. Joining each section's chunks and
+        passing them to assemble() gives the same report as generate().
+        """
+        events = queue.Queue()
+
+        def write(section):
+            parts = []
+            for chunk in self.stream_fn(self.section_prompt(section, analysis_result), bypass_cache):
+                parts.append(chunk)
+                events.put((section.name, chunk))
+            return "".join(parts)
+
+        def write_body():
+            try:
+                events.put((_DONE, run_parallel({section.name: (lambda section=section: write(section)) for section in self.body})))
+            except Exception as e:
+                events.put((_DONE, e))
+
+        worker = threading.Thread(target=contextvars.copy_context().run, args=(write_body,), daemon=True)
+        worker.start()
+
+        while True:
+            name, item = events.get()
+            if name is _DONE:
+                break
+            yield name, item
+        if isinstance(item, Exception):
+            raise item
+
+        results, errors = item
+        texts = {}
+        for section in self.body:
+            if section.name in results:
+                texts[section.name] = results[section.name]
+            else:
+                texts[section.name] = self._unavailable(section, errors[section.name])
+                yield section.name, texts[section.name]
+
+        for chunk in self.stream_fn(self.summary_prompt(texts, analysis_result), bypass_cache):
+            yield self.summary_section.name, chunk
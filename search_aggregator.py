@@ -0,0 +1,137 @@
+import asyncio
+import math
+import re
+from config import SEARCH_MERGE_MAX_QUERIES, SEARCH_MERGE_RESULTS_PER_QUERY, SEARCH_MERGE_MAX_RESULTS
+from prompt_compaction import _terms
+
+
+class SearchAggregator:
+    """Answers the per-country queries of several agents from fewer, broader searches.
+
+    Queries are registered with add() before the agents run. aprefetch() then
+    merges each country's queries into groups of at most
+    SEARCH_MERGE_MAX_QUERIES, similar topics together, and runs one search per
+    group with SEARCH_MERGE_RESULTS_PER_QUERY results for each query merged
+    into it. A registered query is answered with the passages of its country's
+    searches that best match its own topic; other queries, and those whose
+    merged search failed, pass through to the wrapped client. Drop-in for the
+    client's search()/asearch().
+    """
+
+    def __init__(self, client, product_name):
+        self.client = client
+        self.product_name = product_name
+        self.queries = {}
+        self.passages = {}
+        self.failed = set()
+        self.searches = 0
+
+    def add(self, country, query):
+        self.queries[query] = country
+
+    def topic(self, query, country):
+        """The query without the product, country and year"""
+        text = query
+        for name in (self.product_name, country):
+            text = re.sub(re.escape(name), " ", text, flags=re.IGNORECASE)
+        text = re.sub(r"\b\d{4}\b", " ", text)
+        text = re.sub(r"\s+", " ", text).strip(" ,")
+        return re.sub(r"(\s+(for|in|of|to))+$", "", text)
+
+    def plan(self):
+        """Merged searches as a list of (country, query, max_results, merged queries)"""
+        by_country = {}
+        for query, country in self.queries.items():
+            by_country.setdefault(country, []).append(query)
+
+        searches = []
+        for country, queries in by_country.items():
+            target = math.ceil(len(queries) / SEARCH_MERGE_MAX_QUERIES)
+            groups = []
+            for query in queries:
+                terms = _terms(self.topic(query, country))
+                best, best_overlap = None, 0.0
+                for group in groups:
+                    if len(group["queries"]) >= SEARCH_MERGE_MAX_QUERIES:
+                        continue
+                    overlap = len(terms & group["terms"]) / max(1, len(terms | group["terms"]))
+                    if best is None or overlap > best_overlap:
+                        best, best_overlap = group, overlap
+                # Unrelated topics start a group of their own while the country is under its search count
+                if best is None or (best_overlap == 0 and len(groups) < target):
+                    best = {"queries": [], "terms": set()}
+                    groups.append(best)
+                best["queries"].append(query)
+                best["terms"] |= terms
+
+            for group in groups:
+                topics = "; ".join(self.topic(query, country) for query in group["queries"])
+                max_results = min(SEARCH_MERGE_MAX_RESULTS, SEARCH_MERGE_RESULTS_PER_QUERY * len(group["queries"]))
+                searches.append((country, f"{self.product_name} in {country} 2024: {topics}", max_results, group["queries"]))
+        return searches
+
+    async def aprefetch(self):
+        """Run the merged searches concurrently and keep every result by country"""
+        searches = self.plan()
+
+        async def run(query, max_results):
+            try:
+                return await self.client.asearch(query=query, max_results=max_results)
+            except Exception as e:
+                print(f"Merged search failed for {query!r}: {e}")
+                return None
+
+        responses = await asyncio.gather(*(run(query, max_results) for _, query, max_results, _ in searches))
+        self.searches += len(searches)
+        for (country, _, _, merged), response in zip(searches, responses):
+            # A failed search is not an empty one: its queries run on their own instead
+            if response is None:
+                self.failed.update(merged)
+                continue
+            seen = {item.get("url") for item in self.passages.get(country, [])}
+            for item in response.get("results") or []:
+                if item.get("url") not in seen:
+                    seen.add(item.get("url"))
+                    self.passages.setdefault(country, []).append(item)
+
+    def prefetch(self):
+        asyncio.run(self.aprefetch())
+
+    def ranked(self, query, max_results):
+        """The country's passages most relevant to the query's topic, best first"""
+        country = self.queries[query]
+        terms = _terms(self.topic(query, country))
+
+        def relevance(item):
+            text_terms = _terms(f"{item.get('title', '')} {item.get('content', '')}")
+            return (len(terms & text_terms) / max(1, len(terms)), item.get("score") or 0)
+
+        return sorted(self.passages.get(country, []), key=relevance, reverse=True)[:max_results]
+
+    def answers(self, query):
+        """Whether the query is answered from the merged searches"""
+        return query in self.queries and query not in self.failed
+
+    def search(self, query, max_results=5, **kwargs):
+        if self.answers(query):
+            return {"query": query, "results": self.ranked(query, max_results)}
+        return self.client.search(query=query, max_results=max_results, **kwargs)
+
+    async def asearch(self, query, max_results=5, **kwargs):
+        if self.answers(query):
+            return {"query": query, "results": self.ranked(query, max_results)}
+        return await self.client.asearch(query=query, max_results=max_results, **kwargs)
+
+
+def aggregate_searches(agents, product_name, product_description, target_countries):
+    """Point the agents at one SearchAggregator prefilled with all their country
+    queries; returns the aggregator"""
+    agents = list(agents)
+    aggregator = SearchAggregator(agents[0].get_search_client(), product_name)
+    for agent in agents:
+        for country in target_countries:
+            aggregator.add(country, agent.country_query(product_name, product_description, country))
+    aggregator.prefetch()
+    for agent in agents:
+        agent.search_client = aggregator
+    return aggregator
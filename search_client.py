@@ -0,0 +1,104 @@
+import atexit
+import json
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from config import TAVILY_SEARCH_URL, SEARCH_POOL_MAXSIZE, SEARCH_TIMEOUT_SECONDS
+from cache import CachedSearchClient
+from instrumentation import InstrumentedTavilyClient
+
+
+class PooledTavilyClient:
+    """TavilyClient replacement that keeps its HTTPS connections alive.
+
+    TavilyClient opens a new connection, with a fresh TLS handshake, for every
+    search; this client sends its searches over one requests.Session whose
+    connection pool holds up to SEARCH_POOL_MAXSIZE connections, so concurrent
+    agents reuse warm connections. Its search() takes the same arguments and
+    returns the same response as TavilyClient.search().
+    """
+
+    def __init__(self, api_key, url=TAVILY_SEARCH_URL, pool_maxsize=SEARCH_POOL_MAXSIZE, timeout=SEARCH_TIMEOUT_SECONDS):
+        self.api_key = api_key
+        self.url = url
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update({"Content-Type": "application/json"})
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.warmed = False
+
+    def search(self, query, search_depth="basic", topic="general", days=2, max_results=5,
+               include_domains=None, exclude_domains=None, include_answer=False,
+               include_raw_content=False, include_images=False, use_cache=True):
+        data = {
+            "query": query,
+            "search_depth": search_depth,
+            "topic": topic,
+            "days": days,
+            "include_answer": include_answer,
+            "include_raw_content": include_raw_content,
+            "max_results": max_results,
+            "include_domains": include_domains or None,
+            "exclude_domains": exclude_domains or None,
+            "include_images": include_images,
+            "api_key": self.api_key,
+            "use_cache": use_cache,
+        }
+        response = self.session.post(self.url, data=json.dumps(data), timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def warm_up(self):
+        """Open a pooled connection ahead of the first search; failures are ignored"""
+        if self.warmed:
+            return
+        try:
+            self.session.head(self.url, timeout=self.timeout).close()
+            self.warmed = True
+        except requests.RequestException as e:
+            print(f"Search client warm-up failed: {e}")
+
+    def close(self):
+        self.session.close()
+        self.warmed = False
+
+
+_pooled_client = None
+_search_client = None
+_search_client_lock = threading.Lock()
+
+
+def get_search_client(api_key):
+    """Process-wide pooled Tavily client, wrapped in the search cache and
+    instrumentation; rebuilt only if the API key changes"""
+    global _pooled_client, _search_client
+    with _search_client_lock:
+        if _pooled_client is None or _pooled_client.api_key != api_key:
+            if _pooled_client is not None:
+                _pooled_client.close()
+            _pooled_client = PooledTavilyClient(api_key)
+            _search_client = CachedSearchClient(InstrumentedTavilyClient(_pooled_client))
+        return _search_client
+
+
+def warm_up_search_client(api_key):
+    """Create the process-wide client and open its first connection"""
+    get_search_client(api_key)
+    with _search_client_lock:
+        client = _pooled_client
+    client.warm_up()
+
+
+def shutdown_search_client():
+    """Close the process-wide client's connections; the next get_search_client() builds a new one"""
+    global _pooled_client, _search_client
+    with _search_client_lock:
+        if _pooled_client is not None:
+            _pooled_client.close()
+        _pooled_client = None
+        _search_client = None
+
+
+atexit.register(shutdown_search_client)
@@ -0,0 +1,115 @@
+import hashlib
+import json
+import threading
+import time
+from cache import DiskCache
+from config import SECTION_STORE_PATH, SECTION_STORE_MAX_ENTRIES, SECTION_TTLS
+
+
+def fingerprint(sources):
+    """Stable hash of the source data a section was computed from.
+
+    Search results are reduced to their URLs and content, so that relevance
+    scores and response timings don't count as a change.
+    """
+    def normalize(value):
+        if isinstance(value, dict):
+            if "url" in value or "content" in value:
+                return [value.get("url"), value.get("content")]
+            return {key: normalize(item) for key, item in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [normalize(item) for item in value]
+        return value
+
+    payload = json.dumps(normalize(sources), sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SectionStore(DiskCache):
+    """Sections of earlier analyses, each stored with the inputs and source
+    fingerprint it was computed from and when. Entries expire after the
+    section's TTL in SECTION_TTLS."""
+
+    def __init__(self, path=SECTION_STORE_PATH, max_entries=SECTION_STORE_MAX_ENTRIES, ttls=None):
+        super().__init__(path, max_entries)
+        self.ttls = dict(SECTION_TTLS, **(ttls or {}))
+
+    def make_key(self, section, inputs):
+        payload = json.dumps([section, inputs], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def load(self, section, inputs):
+        """The stored record for a section computed from these inputs, or None if missing or expired"""
+        return self.get(self.make_key(section, inputs))
+
+    def save(self, section, inputs, value, source_fingerprint=None):
+        record = {
+            "section": section,
+            "inputs": inputs,
+            "value": value,
+            "fingerprint": source_fingerprint,
+            "updated": time.time()
+        }
+        self.set(self.make_key(section, inputs), record, self.ttls.get(section, self.ttls["default"]))
+        return record
+
+
+class SectionRefresher:
+    """Serves the sections of one analysis from a SectionStore where it can.
+
+    A stored section is reused when it is within its TTL and, for sections
+    backed by searches, freshly fetched source data still has the fingerprint
+    it was stored with; otherwise it is recomputed and stored. With
+    reuse=False every section is recomputed, which seeds the store for later
+    re-checks.
+    """
+
+    def __init__(self, store=None, reuse=True):
+        self.store = store or get_section_store()
+        self.reuse = reuse
+        self.refreshed = []
+        self.reused = []
+        self._lock = threading.Lock()
+
+    def section(self, section, inputs, compute, sources=None, label=None, is_complete=None):
+        """Return the section's value, recomputing it only when needed.
+
+        compute() produces the value. sources(fresh), if given, returns the
+        data it is derived from, typically search results: with fresh=True
+        bypassing the search cache (and refreshing it), with fresh=False as
+        cached, which right after compute() are the results it just used.
+        Sources are only fetched fresh when there is a stored record to check,
+        so a first run pays nothing extra. Values for which is_complete() is
+        false are returned but not stored.
+        """
+        label = label or section
+
+        record = self.store.load(section, inputs) if self.reuse else None
+        if record is not None and (sources is None or record["fingerprint"] == fingerprint(sources(True))):
+            with self._lock:
+                self.reused.append(label)
+            return record["value"]
+
+        value = compute()
+        if is_complete is None or is_complete(value):
+            self.store.save(section, inputs, value, fingerprint(sources(False)) if sources else None)
+        with self._lock:
+            self.refreshed.append(label)
+        return value
+
+    def summary(self):
+        with self._lock:
+            return {"refreshed": list(self.refreshed), "reused": list(self.reused)}
+
+
+_section_store = None
+_section_store_lock = threading.Lock()
+
+
+def get_section_store():
+    """Process-wide SectionStore"""
+    global _section_store
+    with _section_store_lock:
+        if _section_store is None:
+            _section_store = SectionStore()
+        return _section_store
@@ -0,0 +1,90 @@
+import json
+import re
+import threading
+import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from config import ANALYSIS_CACHE_TTL_SECONDS, ANALYSIS_CACHE_MAX_ENTRIES
+
+
+def render_report(events, engine):
+    """Render a report from ReportEngine.stream(), each section streaming into its
+    own slot in report order; returns the assembled report text"""
+    placeholders = {}
+    for section in engine.sections:
+        st.markdown(engine.heading(section))
+        placeholders[section.name] = st.empty()
+
+    texts = {section.name: "" for section in engine.sections}
+    for name, chunk in events:
+        texts[name] += chunk
+        placeholders[name].markdown(texts[name] + "▌")
+    for name, placeholder in placeholders.items():
+        placeholder.markdown(texts[name])
+    return engine.assemble(texts)
+
+
+def analysis_key(agent_name, product_name, product_description, target_countries):
+    """Memo key for an analysis request; case, spacing and country order don't matter"""
+    def normalize(text):
+        return re.sub(r"\s+", " ", text or "").strip().lower()
+    return json.dumps([agent_name, normalize(product_name), normalize(product_description), sorted(set(target_countries))])
+
+
+class _NotMemoized(Exception):
+    """Raised inside the memoized call to keep its result out of the cache"""
+
+    def __init__(self, result=None):
+        super().__init__("analysis not memoized")
+        self.result = result
+
+
+def _missing():
+    raise _NotMemoized()
+
+
+def analysis_complete(result):
+    """False for results that were cut short or carry a placeholder for a failed lookup"""
+    if isinstance(result, dict):
+        if result.get("truncated"):
+            return False
+        return all(analysis_complete(value) for value in result.values())
+    if isinstance(result, (list, tuple)):
+        return all(analysis_complete(value) for value in result)
+    return not (isinstance(result, str) and re.search(r"Not available ?[(:]", result))
+
+
+@st.cache_data(ttl=ANALYSIS_CACHE_TTL_SECONDS, max_entries=ANALYSIS_CACHE_MAX_ENTRIES, show_spinner=False)
+def _memoized_analysis(key, _analyze):
+    result = _analyze()
+    # Exceptions are never cached, so an incomplete result leaves the memo as it was
+    if not analysis_complete(result):
+        raise _NotMemoized(result)
+    return result
+
+
+def memoized_analysis(key, analyze):
+    """analyze()'s result, shared by every session asking for the same key
+    within ANALYSIS_CACHE_TTL_SECONDS. Failed, truncated and partial analyses
+    are not kept, so the next request runs them again."""
+    try:
+        return _memoized_analysis(key, analyze)
+    except _NotMemoized as e:
+        return e.result
+
+
+def cached_analysis(key):
+    """The memoized result for key, or None without running anything"""
+    try:
+        return _memoized_analysis(key, _missing)
+    except _NotMemoized:
+        return None
+
+
+def with_script_context(fn):
+    """Wrap fn so it can use Streamlit caching from a worker thread"""
+    ctx = get_script_run_ctx()
+
+    def run(*args, **kwargs):
+        add_script_run_ctx(threading.current_thread(), ctx)
+        return fn(*args, **kwargs)
+    return run
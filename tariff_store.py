@@ -0,0 +1,244 @@
+import argparse
+import calendar
+import csv
+import glob
+import json
+import math
+import os
+import re
+import threading
+import time
+import numpy as np
+from config import TARIFF_STORE_PATH, TARIFF_SOURCE_CSV
+
+RECORD_DTYPE = np.dtype([
+    ("hs6", "<u4"),
+    ("country", "<u2"),
+    ("rate", "<f4"),
+    ("updated", "<u4")
+])
+
+
+def normalize_hs6(hs_code):
+    """First six digits of an HS code such as "9603.21" or "96032100"; None if too short"""
+    digits = re.sub(r"\D", "", str(hs_code))
+    return int(digits[:6]) if len(digits) >= 6 else None
+
+
+def _meta_path(path):
+    return os.path.splitext(path)[0] + ".meta.json"
+
+
+def _data_path(path, version):
+    """Data file of one import of the table at path; np.save insists on .npy"""
+    return f"{os.path.splitext(path)[0]}.{version}.npy"
+
+
+class TariffStore:
+    """Read-only tariff table memory-mapped from a NumPy record file.
+
+    Records are (hs6, country index, rate, updated), sorted by (hs6, country),
+    and the country names live in a JSON sidecar that also names the data file
+    of the import it belongs to. Lookups binary search the mapped records, so
+    opening the table reads nothing but the sidecar and a lookup only touches
+    the few pages its search visits.
+    """
+
+    def __init__(self, path=TARIFF_STORE_PATH):
+        self.path = path
+        self.records = np.empty(0, dtype=RECORD_DTYPE)
+        self.countries = []
+        self.meta = {}
+        self._country_ids = {}
+        self._version = None
+        self._lock = threading.Lock()
+        self.reload()
+
+    def _sidecar_version(self):
+        """Identity of the current sidecar file, or None if there is none"""
+        try:
+            stat = os.stat(_meta_path(self.path))
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+
+    def reload(self):
+        """(Re)open the table; a missing file gives an empty store"""
+        version = self._sidecar_version()
+        if version is None:
+            return
+        with open(_meta_path(self.path), encoding="utf-8") as f:
+            meta = json.load(f)
+        # Tables written before the sidecar named its data file keep it at path
+        data_path = os.path.join(os.path.dirname(self.path), meta["data"]) if "data" in meta else self.path
+        records = np.load(data_path, mmap_mode="r")
+        with self._lock:
+            self.meta = meta
+            self.records = records
+            self.countries = meta["countries"]
+            self._country_ids = {name.casefold(): i for i, name in enumerate(self.countries)}
+            self._version = version
+
+    def reload_if_changed(self):
+        """Reopen the table if an import has replaced its sidecar since it was opened"""
+        if self._sidecar_version() != self._version:
+            self.reload()
+
+    def __len__(self):
+        return len(self.records)
+
+    def lookup(self, hs_code, country):
+        """Tariff rate (percent) for the pair, or None if the table doesn't have it"""
+        record = self.lookup_record(hs_code, country)
+        return None if record is None else record["rate"]
+
+    def lookup_record(self, hs_code, country):
+        """Dict with rate and updated date for the pair, or None"""
+        with self._lock:
+            records, countries, country_ids = self.records, self.countries, self._country_ids
+        hs6 = normalize_hs6(hs_code)
+        country_id = country_ids.get(str(country).casefold())
+        if hs6 is None or country_id is None:
+            return None
+
+        # Records compare field by field, so searching for the pair with the
+        # lowest possible rate finds the pair's row if it has one. The mapped
+        # records are contiguous, so searchsorted doesn't copy them.
+        probe = np.array((hs6, country_id, -np.inf, 0), dtype=RECORD_DTYPE)
+        row = int(np.searchsorted(records, probe))
+        if row == len(records):
+            return None
+        record = records[row]
+        if record["hs6"] != hs6 or record["country"] != country_id:
+            return None
+        return {
+            "hs_code": f"{hs6:06d}",
+            "country": countries[country_id],
+            "rate": round(float(record["rate"]), 3),
+            "updated": time.strftime("%Y-%m-%d", time.gmtime(int(record["updated"])))
+        }
+
+
+def read_tariff_csv(csv_path):
+    """Yield (hs6, country, rate, updated) from a CSV with hs_code, country and tariff_rate columns.
+
+    An optional "updated" column (YYYY-MM-DD) dates each row; otherwise the
+    import time is used. Rows with an unusable HS code, date or rate (not a
+    number from 0 to 100) are skipped.
+    """
+    now = int(time.time())
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            hs6 = normalize_hs6(row.get("hs_code", ""))
+            try:
+                rate = float(str(row.get("tariff_rate", "")).replace("%", "").strip())
+            except ValueError:
+                continue
+            if hs6 is None or not row.get("country", "").strip() or not (math.isfinite(rate) and 0 <= rate <= 100):
+                continue
+            updated = now
+            if row.get("updated"):
+                try:
+                    updated = calendar.timegm(time.strptime(row["updated"].strip(), "%Y-%m-%d"))
+                except ValueError:
+                    continue
+            yield hs6, row["country"].strip(), rate, updated
+
+
+def import_tariffs(csv_path, path=TARIFF_STORE_PATH, replace=False):
+    """Bulk import a CSV into the tariff table, merging with existing rows unless replace=True.
+
+    The new rows go to a data file of their own and the sidecar, rewritten
+    to name it, is swapped in atomically, so a reader always opens a matching
+    pair and readers that already mapped the old file are unaffected.
+    """
+    rows = {}
+    countries = []
+    store = TariffStore(path)
+    old_data = store.meta.get("data")
+    if not replace:
+        countries = list(store.countries)
+        for record in store.records:
+            rows[(int(record["hs6"]), int(record["country"]))] = (float(record["rate"]), int(record["updated"]))
+
+    country_ids = {name.casefold(): i for i, name in enumerate(countries)}
+    for hs6, country, rate, updated in read_tariff_csv(csv_path):
+        if country.casefold() not in country_ids:
+            country_ids[country.casefold()] = len(countries)
+            countries.append(country)
+        rows[(hs6, country_ids[country.casefold()])] = (rate, updated)
+
+    records = np.array(
+        [(hs6, country_id, rate, updated) for (hs6, country_id), (rate, updated) in sorted(rows.items())],
+        dtype=RECORD_DTYPE
+    )
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    data_path = _data_path(path, f"{time.time_ns()}-{os.getpid()}")
+    np.save(data_path, records)
+    with open(_meta_path(path) + ".tmp", "w", encoding="utf-8") as f:
+        json.dump({
+            "countries": countries, "data": os.path.basename(data_path),
+            "source": os.path.abspath(csv_path), "imported_at": int(time.time())
+        }, f)
+    os.replace(_meta_path(path) + ".tmp", _meta_path(path))
+
+    # The previous data file stays for readers that read the old sidecar just
+    # before the swap; anything older is removed (mapped files stay readable)
+    previous = os.path.join(directory, old_data) if old_data else path
+    for stale in glob.glob(glob.escape(os.path.splitext(path)[0]) + ".*.npy") + [path]:
+        if stale not in (data_path, previous) and os.path.exists(stale):
+            try:
+                os.remove(stale)
+            except OSError as e:
+                print(f"Could not remove old tariff data {stale}: {e}")
+
+    return len(records)
+
+
+_tariff_store = None
+_tariff_store_lock = threading.Lock()
+
+
+def get_tariff_store():
+    """Process-wide TariffStore, reopened when an import has replaced the table"""
+    global _tariff_store
+    with _tariff_store_lock:
+        if _tariff_store is None:
+            _tariff_store = TariffStore()
+        else:
+            _tariff_store.reload_if_changed()
+        return _tariff_store
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the local tariff table")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = subparsers.add_parser("import", help="Bulk import tariffs from a CSV file")
+    import_parser.add_argument("csv_path")
+    import_parser.add_argument("--replace", action="store_true", help="Discard existing rows instead of merging")
+
+    refresh_parser = subparsers.add_parser("refresh", help="Rebuild the table from the configured source CSV")
+    refresh_parser.add_argument("--source", default=TARIFF_SOURCE_CSV)
+
+    subparsers.add_parser("info", help="Show table size and source")
+
+    args = parser.parse_args()
+    if args.command == "import":
+        count = import_tariffs(args.csv_path, replace=args.replace)
+        print(f"Tariff table now holds {count} rows ({TARIFF_STORE_PATH})")
+    elif args.command == "refresh":
+        if not args.source:
+            parser.error("No source CSV; pass --source or set TARIFF_SOURCE_CSV")
+        count = import_tariffs(args.source, replace=True)
+        print(f"Rebuilt tariff table from {args.source}: {count} rows")
+    else:
+        store = TariffStore()
+        print(f"{len(store)} rows, {len(store.countries)} countries, source: {store.meta.get('source', 'n/a')}")
+
+
+if __name__ == "__main__":
+    main()
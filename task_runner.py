@@ -0,0 +1,162 @@
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from config import MAX_CONCURRENCY, TASK_TIMEOUT_SECONDS
+
+
+class TaskTimeoutError(TimeoutError):
+    """Raised in place of a result when a task runs past its timeout"""
+
+
+class DependencyError(RuntimeError):
+    """Recorded in place of a result when a task is skipped because a dependency failed"""
+
+
+def _collect(pending, started, timeout_for, results, errors):
+    """Wait briefly for pending futures; move finished and timed-out tasks into results/errors.
+    timeout_for(key) gives a task's timeout."""
+    done, _ = wait(pending, timeout=0.05, return_when=FIRST_COMPLETED)
+    for future in done:
+        key = pending.pop(future)
+        try:
+            results[key] = future.result()
+        except Exception as e:
+            errors[key] = e
+
+    now = time.monotonic()
+    for future, key in list(pending.items()):
+        if key in started and now - started[key] > timeout_for(key):
+            # The worker thread can't be interrupted; abandon its result.
+            future.cancel()
+            del pending[future]
+            errors[key] = TaskTimeoutError(f"Task {key!r} exceeded {timeout_for(key)}s")
+
+
+def iter_parallel(tasks, max_workers=None, timeout=None):
+    """Run zero-argument callables on a bounded thread pool, yielding
+    (key, result, error) for each task as soon as it finishes.
+
+    tasks: dict of key -> callable. Exactly one of result and error is set;
+    error is the exception the task raised, or a TaskTimeoutError. Each task
+    gets its own timeout, measured from the moment a worker picks it up, so
+    queueing behind a full pool never counts against it. A timed-out task's
+    thread can't be stopped, so it stops counting towards max_workers and the
+    next queued task starts on a fresh thread instead of waiting for it. The
+    generator must be consumed on the caller's thread.
+    """
+    if not tasks:
+        return
+
+    max_workers = max(1, min(max_workers or MAX_CONCURRENCY, len(tasks)))
+    timeout = TASK_TIMEOUT_SECONDS if timeout is None else timeout
+
+    started = {}
+
+    def _run(key, fn):
+        started[key] = time.monotonic()
+        return fn()
+
+    # Concurrency is bounded by submitting at most max_workers live tasks; the
+    # executor itself has room for replacements of abandoned threads
+    executor = ThreadPoolExecutor(max_workers=len(tasks))
+    queued = list(tasks.items())
+    pending = {}
+    try:
+        while queued or pending:
+            while queued and len(pending) < max_workers:
+                key, fn = queued.pop(0)
+                # Each task runs in a copy of the caller's context, so context variables
+                # such as the current analysis' metrics follow it onto the worker thread
+                pending[executor.submit(contextvars.copy_context().run, _run, key, fn)] = key
+            results, errors = {}, {}
+            _collect(pending, started, lambda key: timeout, results, errors)
+            for key, result in results.items():
+                yield key, result, None
+            for key, error in errors.items():
+                yield key, None, error
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def run_parallel(tasks, max_workers=None, timeout=None):
+    """Run zero-argument callables on a bounded thread pool.
+
+    tasks: dict of key -> callable. Returns (results, errors), two dicts keyed
+    like tasks, once every task has finished or timed out (see iter_parallel).
+    A task that fails or times out appears in errors instead of results; the
+    caller decides what fallback to use.
+    """
+    results, errors = {}, {}
+    for key, result, error in iter_parallel(tasks, max_workers, timeout):
+        if error is None:
+            results[key] = result
+        else:
+            errors[key] = error
+    return results, errors
+
+
+def run_graph(tasks, max_workers=None, timeout=None, timeouts=None):
+    """Run a fixed dependency graph of tasks on a bounded thread pool.
+
+    tasks: dict of key -> (callable, deps) or (callable, deps, partial),
+    where deps lists the keys the task needs. Each callable receives a dict of
+    its dependencies' results and starts as soon as the last of them finishes.
+    Timeouts and the returned (results, errors) work as in run_parallel. A
+    task with a failed dependency is not run and gets a DependencyError,
+    unless it is marked partial, in which case it runs with the results that
+    did succeed. timeouts maps task keys to timeouts that override timeout.
+    """
+    if not tasks:
+        return {}, {}
+
+    tasks = {key: (task[0], list(task[1]), task[2] if len(task) > 2 else False) for key, task in tasks.items()}
+    for key, (_, deps, _) in tasks.items():
+        unknown = [dep for dep in deps if dep not in tasks]
+        if unknown:
+            raise ValueError(f"Task {key!r} depends on unknown tasks {unknown!r}")
+
+    max_workers = max(1, min(max_workers or MAX_CONCURRENCY, len(tasks)))
+    timeout = TASK_TIMEOUT_SECONDS if timeout is None else timeout
+    timeouts = timeouts or {}
+
+    started = {}
+
+    def _run(key, fn, inputs):
+        started[key] = time.monotonic()
+        return fn(inputs)
+
+    results, errors = {}, {}
+    waiting = dict(tasks)
+    ready = []
+    pending = {}
+    # As in iter_parallel, timed-out tasks stop counting towards max_workers
+    executor = ThreadPoolExecutor(max_workers=len(tasks))
+    try:
+        while waiting or ready or pending:
+            scheduled = True
+            while scheduled:
+                scheduled = False
+                for key, (fn, deps, partial) in list(waiting.items()):
+                    failed = [dep for dep in deps if dep in errors]
+                    if failed and not partial:
+                        errors[key] = DependencyError(f"Task {key!r} skipped because {failed[0]!r} failed")
+                    elif all(dep in results or dep in errors for dep in deps):
+                        ready.append((key, fn, {dep: results[dep] for dep in deps if dep in results}))
+                    else:
+                        continue
+                    del waiting[key]
+                    scheduled = True
+
+            while ready and len(pending) < max_workers:
+                key, fn, inputs = ready.pop(0)
+                pending[executor.submit(contextvars.copy_context().run, _run, key, fn, inputs)] = key
+
+            if not pending:
+                if waiting:
+                    raise ValueError(f"Dependency cycle among tasks {list(waiting)!r}")
+                break
+            _collect(pending, started, lambda key: timeouts.get(key, timeout), results, errors)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return results, errors
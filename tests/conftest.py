@@ -0,0 +1,14 @@
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Keep the caches and stores the agents open out of the working tree
+_state_dir = tempfile.mkdtemp(prefix="market-entry-tests-")
+for name, filename in [("SEARCH_CACHE_PATH", "search.sqlite3"), ("LLM_CACHE_PATH", "llm.sqlite3"),
+                       ("SECTION_STORE_PATH", "sections.sqlite3"), ("TRANSLATION_CACHE_PATH", "translations.sqlite3"),
+                       ("TARIFF_STORE_PATH", "tariffs.npy")]:
+    os.environ.setdefault(name, os.path.join(_state_dir, filename))
+os.environ.setdefault("GEMINI_API_KEY", "test")
+os.environ.setdefault("TAVILY_API_KEY", "test")
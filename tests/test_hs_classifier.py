@@ -0,0 +1,46 @@
+import pytest
+from config import HS_CLASSIFIER_MIN_CONFIDENCE
+from hs_classifier import HSCodeIndex
+
+
+@pytest.fixture(scope="module")
+def index():
+    return HSCodeIndex.from_file()
+
+
+@pytest.mark.parametrize("product_name, code", [
+    ("Bamboo Toothbrush", "960321"),
+    ("bamboo tooth brush", "960321"),
+    ("bamboo toothbursh", "960321"),
+    ("organic bamboo toothbrush", "960321"),
+    ("organic toothpaste", "330610"),
+    ("soy candle", "340600"),
+    ("Organic Cotton T-Shirt", "610910"),
+    ("Stainless Steel Water Bottle", "732393"),
+    ("Natural Soap Bar", "340111"),
+])
+def test_confident_matches(index, product_name, code):
+    matched, confidence = index.classify(product_name)
+    assert matched == code
+    assert confidence >= HS_CLASSIFIER_MIN_CONFIDENCE
+
+
+@pytest.mark.parametrize("product_name", [
+    "toothpaste dispenser",
+    "candle holder",
+    "toothbrush sterilizer",
+    "bamboo toothbrush charging stand",
+])
+def test_accessories_fall_below_threshold(index, product_name):
+    _, confidence = index.classify(product_name)
+    assert confidence < HS_CLASSIFIER_MIN_CONFIDENCE
+
+
+def test_unknown_product(index):
+    assert index.classify("quantum flux capacitor") == (None, 0.0)
+
+
+def test_description_does_not_explain_name(index):
+    # The description matching the table doesn't vouch for an unmatched head noun
+    _, confidence = index.classify("candle holder", "holds a soy candle")
+    assert confidence < HS_CLASSIFIER_MIN_CONFIDENCE
@@ -0,0 +1,51 @@
+import asyncio
+import pytest
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_google_genai import ChatGoogleGenerativeAI
+from langchain_community.utilities.tavily_search import TavilySearchAPIWrapper
+from langchain_agent import GlobalMarketEntryAgent
+
+
+@pytest.fixture
+def agent(monkeypatch):
+    """Agent whose model and search run offline; like the Gemini gRPC client,
+    the model's async path only works on the first event loop it runs on"""
+    loops = []
+
+    def generate(self, messages, stop=None, run_manager=None, **kwargs):
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="summary"))])
+
+    async def agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        loops.append(loops[0] if loops else asyncio.get_running_loop())
+        if loops[0] is not asyncio.get_running_loop():
+            raise RuntimeError("Event loop is closed")
+        return generate(self, messages)
+
+    def results(self, query, max_results=5, **kwargs):
+        return [{"url": "https://example.com", "content": f"Results for {query}"}]
+
+    async def aresults(self, query, max_results=5, **kwargs):
+        return results(self, query)
+
+    monkeypatch.setattr(ChatGoogleGenerativeAI, "_generate", generate)
+    monkeypatch.setattr(ChatGoogleGenerativeAI, "_agenerate", agenerate)
+    monkeypatch.setattr(TavilySearchAPIWrapper, "results", results)
+    monkeypatch.setattr(TavilySearchAPIWrapper, "results_async", aresults)
+    return GlobalMarketEntryAgent(bypass_llm_cache=True)
+
+
+def test_analyze_market_tool_works_on_every_call(agent):
+    tool = agent.tools_by_name["analyze_market"]
+    for country in ["Germany", "Canada"]:
+        market_data = tool.invoke({"product_name": "Bamboo Toothbrush", "hs_code": "960321", "countries": [country]})
+        for field in ["tariff_rate", "market_size", "competitors"]:
+            assert market_data[country][field] == "summary"
+
+
+def test_planner_turns_go_through_the_gemini_provider(agent):
+    from outbound import get_provider
+    provider = get_provider("gemini")
+    calls = provider.calls
+    assert agent.planner_llm.invoke("Which tool next?").content == "summary"
+    assert provider.calls == calls + 1
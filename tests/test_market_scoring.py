@@ -0,0 +1,39 @@
+import warnings
+import numpy as np
+import pandas as pd
+from market_scoring import FEATURES, rank_markets, score_feature_cube
+
+
+def test_higher_is_better_after_direction_flip():
+    cube = np.array([[[0.0, 1e9, 2, 3, 1], [10.0, 1e6, 5, 0, 4]]])
+    scores = score_feature_cube(cube)
+    assert scores.shape == (1, 2)
+    assert scores[0, 0] > scores[0, 1]
+
+
+def test_feature_missing_everywhere_scores_neutral_without_warnings():
+    cube = np.array([[[0.0, np.nan, 2, 3, 1], [10.0, np.nan, 5, 0, 4]]])
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        scores = score_feature_cube(cube)
+    assert np.isfinite(scores).all()
+
+    weights = {name: 0 for name in FEATURES}
+    weights["market_size"] = 1
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        assert np.allclose(score_feature_cube(cube, weights), 50)
+
+
+def test_empty_cube():
+    assert score_feature_cube(np.empty((0, 0, len(FEATURES)))).shape == (0, 0)
+
+
+def test_rank_markets_ranks_within_each_product():
+    features = pd.DataFrame(
+        [["p", "Germany", 0.0, 1e9, 2, 3, 1], ["p", "UAE", 10.0, 1e6, 5, 0, 4]],
+        columns=["product", "country"] + FEATURES
+    ).set_index(["product", "country"])
+    ranked = rank_markets(features)
+    assert ranked["country"].tolist() == ["Germany", "UAE"]
+    assert ranked["rank"].tolist() == [1, 2]
@@ -0,0 +1,47 @@
+from base_agent import BaseAgent
+from search_aggregator import aggregate_searches
+from streamlit_utils import analysis_complete
+
+
+class FakeClient:
+    """Fails merged searches; per-country searches fail only if individual_fails is set"""
+
+    def __init__(self, individual_fails=False):
+        self.individual_fails = individual_fails
+        self.queries = []
+
+    async def asearch(self, query, max_results=5, **kwargs):
+        self.queries.append(query)
+        if ": " in query or self.individual_fails:
+            raise RuntimeError("search unavailable")
+        return {"query": query, "results": [{"url": "https://example.com", "content": f"About {query}"}]}
+
+
+class TopicAgent(BaseAgent):
+    def __init__(self, topic, client):
+        super().__init__()
+        self.topic = topic
+        self.search_client = client
+
+    def country_query(self, product_name, product_description, country):
+        return f"{self.topic} for {product_name} in {country} 2024"
+
+
+def test_queries_of_failed_merged_searches_run_on_their_own():
+    client = FakeClient()
+    agents = [TopicAgent("market size", client), TopicAgent("competitors", client)]
+    aggregator = aggregate_searches(agents, "Bamboo Toothbrush", "", ["Germany"])
+
+    analysis = agents[0].analyze("Bamboo Toothbrush", "", ["Germany"])
+    assert analysis == "**Germany**: About market size for Bamboo Toothbrush in Germany 2024"
+    assert aggregator.failed == set(aggregator.queries)
+
+
+def test_failed_searches_are_not_reported_as_complete():
+    client = FakeClient(individual_fails=True)
+    agents = [TopicAgent("market size", client), TopicAgent("competitors", client)]
+    aggregate_searches(agents, "Bamboo Toothbrush", "", ["Germany"])
+
+    analysis = agents[0].analyze("Bamboo Toothbrush", "", ["Germany"])
+    assert "No data found" not in analysis
+    assert not analysis_complete(analysis)
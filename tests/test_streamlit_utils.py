@@ -0,0 +1,24 @@
+import pytest
+from streamlit_utils import analysis_complete, memoized_analysis
+
+
+@pytest.mark.parametrize("result", [
+    "**Germany**: Market is growing.",
+    {"analysis": "Enter Germany first.", "truncated": False, "truncation_reason": None},
+])
+def test_complete_analyses(result):
+    assert analysis_complete(result)
+
+
+@pytest.mark.parametrize("result", [
+    "**Germany**: Not available (search timed out after 20s).",
+    {"analysis": "Enter Germany first.", "truncated": True, "truncation_reason": "time budget"},
+    {"analysis": "## Competitors\n_Not available: timed out_", "truncated": False},
+])
+def test_incomplete_analyses(result):
+    assert not analysis_complete(result)
+
+
+def test_incomplete_analysis_is_still_returned():
+    result = {"analysis": "partial", "truncated": True}
+    assert memoized_analysis("incomplete", lambda: result) is result
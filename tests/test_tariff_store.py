@@ -0,0 +1,73 @@
+import time
+from tariff_store import TariffStore, import_tariffs
+
+
+def write_csv(path, rows):
+    path.write_text("hs_code,country,tariff_rate,updated\n" + "".join(f"{row}\n" for row in rows))
+    return str(path)
+
+
+def test_lookup_finds_only_imported_pairs(tmp_path):
+    table = str(tmp_path / "tariffs.npy")
+    import_tariffs(write_csv(tmp_path / "a.csv", ["9603.21,Germany,4.5,", "9603.21,UAE,5,", "4419.90,Germany,3%,"]), table)
+
+    store = TariffStore(table)
+    assert len(store) == 3
+    assert store.lookup("96032100", "germany") == 4.5
+    assert store.lookup("441990", "Germany") == 3.0
+    assert store.lookup("441990", "UAE") is None
+    assert store.lookup("000001", "UAE") is None
+    assert store.lookup("999999", "UAE") is None
+    assert store.lookup("9603", "UAE") is None
+
+
+def test_updated_date_round_trips_outside_utc(tmp_path, monkeypatch):
+    monkeypatch.setenv("TZ", "Asia/Tokyo")
+    if hasattr(time, "tzset"):
+        time.tzset()
+    try:
+        table = str(tmp_path / "tariffs.npy")
+        import_tariffs(write_csv(tmp_path / "a.csv", ["9603.21,Germany,4.5,2024-01-15"]), table)
+        assert TariffStore(table).lookup_record("960321", "Germany")["updated"] == "2024-01-15"
+    finally:
+        monkeypatch.undo()
+        if hasattr(time, "tzset"):
+            time.tzset()
+
+
+def test_reimport_leaves_open_stores_on_their_own_table(tmp_path):
+    table = str(tmp_path / "tariffs.npy")
+    import_tariffs(write_csv(tmp_path / "a.csv", ["9603.21,Germany,4.5,"]), table)
+    old = TariffStore(table)
+
+    import_tariffs(write_csv(tmp_path / "b.csv", ["9603.21,Japan,0,"]), table, replace=True)
+    new = TariffStore(table)
+    assert new.lookup("960321", "Japan") == 0.0
+    assert new.lookup("960321", "Germany") is None
+    assert old.lookup("960321", "Germany") == 4.5
+
+
+def test_unusable_rows_are_skipped(tmp_path):
+    table = str(tmp_path / "tariffs.npy")
+    count = import_tariffs(write_csv(tmp_path / "a.csv", [
+        "9603.21,Germany,4.5,2024/01/15", "9603.22,Germany,nan,", "9603.23,Germany,-2,",
+        "9603.24,Germany,140,", "9603.25,Germany,0,2024-01-15"
+    ]), table)
+
+    store = TariffStore(table)
+    assert count == 1
+    assert store.lookup("960325", "Germany") == 0.0
+    assert store.lookup("960322", "Germany") is None
+
+
+def test_process_store_picks_up_a_new_import(tmp_path, monkeypatch):
+    import tariff_store
+    table = str(tmp_path / "tariffs.npy")
+    monkeypatch.setattr(tariff_store, "_tariff_store", TariffStore(table))
+    assert tariff_store.get_tariff_store().lookup("960321", "Germany") is None
+
+    import_tariffs(write_csv(tmp_path / "a.csv", ["9603.21,Germany,4.5,"]), table)
+    assert tariff_store.get_tariff_store().lookup("960321", "Germany") == 4.5
+
+    import_tariffs(write_csv(tmp_path / "b.csv", ["9603.21,Germany,6,"]), table)
+    assert tariff_store.get_tariff_store().lookup("960321", "Germany") == 6.0
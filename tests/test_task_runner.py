@@ -0,0 +1,52 @@
+import time
+import pytest
+from task_runner import DependencyError, TaskTimeoutError, run_graph, run_parallel
+
+
+def test_run_parallel_collects_results_and_errors():
+    def fail():
+        raise ValueError("boom")
+
+    results, errors = run_parallel({"ok": lambda: 1, "fail": fail})
+    assert results == {"ok": 1}
+    assert isinstance(errors["fail"], ValueError)
+
+
+def test_timed_out_tasks_do_not_hold_up_queued_ones():
+    started = time.monotonic()
+    results, errors = run_parallel(
+        {i: (lambda i=i: time.sleep(2 if i < 2 else 0) or i) for i in range(4)},
+        max_workers=2, timeout=0.2
+    )
+    assert results == {2: 2, 3: 3}
+    assert all(isinstance(errors[i], TaskTimeoutError) for i in (0, 1))
+    assert time.monotonic() - started < 1
+
+
+def test_run_graph_dependencies():
+    def fail(deps):
+        raise ValueError("boom")
+
+    results, errors = run_graph({
+        "a": (lambda deps: 1, []),
+        "b": (lambda deps: deps["a"] + 1, ["a"]),
+        "bad": (fail, []),
+        "skipped": (lambda deps: 0, ["bad"]),
+        "partial": (lambda deps: sorted(deps), ["b", "bad"], True),
+    })
+    assert results == {"a": 1, "b": 2, "partial": ["b"]}
+    assert isinstance(errors["skipped"], DependencyError)
+
+
+def test_run_graph_per_task_timeouts():
+    results, errors = run_graph(
+        {"slow": (lambda deps: time.sleep(0.3) or 1, []), "fast": (lambda deps: time.sleep(0.3) or 2, [])},
+        timeout=0.1, timeouts={"slow": 1}
+    )
+    assert results == {"slow": 1}
+    assert isinstance(errors["fast"], TaskTimeoutError)
+
+
+def test_run_graph_cycle():
+    with pytest.raises(ValueError):
+        run_graph({"x": (lambda deps: 1, ["y"]), "y": (lambda deps: 1, ["x"])})
@@ -0,0 +1,150 @@
+import hashlib
+import json
+import re
+import threading
+from cache import DiskCache
+from config import (
+    LANGUAGE_BY_COUNTRY, TRANSLATION_CACHE_PATH, TRANSLATION_CACHE_MAX_ENTRIES, TRANSLATION_CACHE_TTL,
+    TRANSLATION_BATCH_SIZE, TRANSLATION_MAX_REPROMPTS
+)
+from task_runner import run_parallel
+
+
+def listing_languages(countries):
+    """Languages a listing needs translating into for these markets, in country order"""
+    languages = [LANGUAGE_BY_COUNTRY.get(country) for country in countries]
+    return list(dict.fromkeys(language for language in languages if language and language != "English"))
+
+
+def listing_hash(product_name, description):
+    """Stable hash of a listing's text"""
+    payload = json.dumps([product_name.strip(), description.strip()])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class TranslationCache(DiskCache):
+    """Translated listings keyed on listing hash and language"""
+
+    def __init__(self, path=TRANSLATION_CACHE_PATH, max_entries=TRANSLATION_CACHE_MAX_ENTRIES, ttl=TRANSLATION_CACHE_TTL):
+        super().__init__(path, max_entries)
+        self.ttl = ttl
+
+    def make_key(self, listing, language):
+        return f"{listing}:{language.strip().lower()}"
+
+    def load(self, listing, language):
+        return self.get(self.make_key(listing, language))
+
+    def save(self, listing, language, translation):
+        self.set(self.make_key(listing, language), translation, self.ttl)
+
+
+class ListingTranslator:
+    """Translates one product listing into several languages at once.
+
+    Languages already in the cache are served from it; the rest are asked for
+    in batches of TRANSLATION_BATCH_SIZE, each batch a single model call
+    returning a JSON object of name/description pairs. Languages missing or
+    malformed in a reply are asked for again, up to TRANSLATION_MAX_REPROMPTS
+    times. generate_fn(prompt, bypass_cache) returns text.
+    """
+
+    def __init__(self, generate_fn, cache=None, batch_size=TRANSLATION_BATCH_SIZE):
+        self.generate_fn = generate_fn
+        self.cache = cache or get_translation_cache()
+        self.batch_size = batch_size
+
+    def prompt(self, product_name, description, languages):
+        schema = ", ".join(f'"{language}": {{"name": "...", "description": "..."}}' for language in languages)
+        return f"""
+        Translate this product listing into each of these languages: {", ".join(languages)}.
+
+        Product Name: {product_name}
+        Description: {description}
+
+        Make each translation culturally appropriate for its speakers and optimize it for e-commerce platforms.
+        Include relevant keywords for sustainability and eco-friendly products.
+
+        Return only a JSON object with one key per language:
+        {{{schema}}}
+        """
+
+    def _parse(self, text, languages):
+        """The well-formed translations in a model response, by requested language"""
+        match = re.search(r"\{.*\}", text, re.DOTALL)
+        if not match:
+            raise ValueError("No JSON object in model response")
+        data = json.loads(match.group(0))
+        if not isinstance(data, dict):
+            raise ValueError("Model response is not a JSON object")
+
+        by_language = {str(key).strip().lower(): value for key, value in data.items()}
+        translations = {}
+        for language in languages:
+            entry = by_language.get(language.lower())
+            if not isinstance(entry, dict):
+                continue
+            name, description = entry.get("name"), entry.get("description")
+            if isinstance(name, str) and isinstance(description, str) and name.strip() and description.strip():
+                translations[language] = {"name": name.strip(), "description": description.strip()}
+        return translations
+
+    def _translate_batch(self, product_name, description, languages):
+        translations = {}
+        pending = list(languages)
+        for attempt in range(TRANSLATION_MAX_REPROMPTS + 1):
+            try:
+                # A re-prompt must not be answered from the cache
+                text = self.generate_fn(self.prompt(product_name, description, pending), True if attempt else None)
+                translations.update(self._parse(text, pending))
+            except Exception as e:
+                print(f"Error translating listing into {', '.join(pending)}: {e}")
+            pending = [language for language in pending if language not in translations]
+            if not pending:
+                break
+        return translations
+
+    def translate(self, product_name, description, languages):
+        """Return {language: {"name", "description"}} for each requested language.
+
+        Languages that could not be translated are left out of the result.
+        """
+        languages = list(dict.fromkeys(languages))
+        listing = listing_hash(product_name, description)
+        translations = {}
+        for language in languages:
+            cached = self.cache.load(listing, language)
+            if cached is not None:
+                translations[language] = cached
+
+        missing = [language for language in languages if language not in translations]
+        batches = [missing[i:i + self.batch_size] for i in range(0, len(missing), self.batch_size)]
+        results, errors = run_parallel({
+            index: (lambda batch=batch: self._translate_batch(product_name, description, batch))
+            for index, batch in enumerate(batches)
+        })
+        for index, error in errors.items():
+            print(f"Error translating listing into {', '.join(batches[index])}: {error}")
+
+        for batch_translations in results.values():
+            for language, translation in batch_translations.items():
+                self.cache.save(listing, language, translation)
+                translations[language] = translation
+
+        for language in missing:
+            if language not in translations:
+                print(f"No translation into {language} for {product_name}")
+        return {language: translations[language] for language in languages if language in translations}
+
+
+_translation_cache = None
+_translation_cache_lock = threading.Lock()
+
+
+def get_translation_cache():
+    """Process-wide TranslationCache shared by both GlobalMarketEntryAgent variants"""
+    global _translation_cache
+    with _translation_cache_lock:
+        if _translation_cache is None:
+            _translation_cache = TranslationCache()
+        return _translation_cache